@@ -5,8 +5,13 @@ from flask import Flask, send_from_directory, jsonify
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from .config import config
-from .extensions import db, cors
+from .extensions import db, cors, socketio
 from .routes import all_blueprints
+from .sockets import all_namespaces
+from .games import poker_manager
+from .utils.api_cache import amap_cache
+from .utils.http_client import amap_http, dashscope_http
+from .routes.travel import route_jobs
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -40,6 +45,15 @@ def create_app(config_name=None):
     cors.init_app(app,
                   supports_credentials=True,
                   origins=app.config['CORS_ORIGINS'])
+    socketio.init_app(app,
+                      cors_allowed_origins=app.config['CORS_ORIGINS'],
+                      async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+                      message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
+    poker_manager.init_app(app)
+    amap_cache.init_app(app)
+    amap_http.init_app(app)
+    dashscope_http.init_app(app)
+    route_jobs.init_app(app)
 
     # Enable proxy support (for Nginx)
     app.wsgi_app = ProxyFix(app.wsgi_app)
@@ -48,6 +62,10 @@ def create_app(config_name=None):
     for blueprint in all_blueprints:
         app.register_blueprint(blueprint)
 
+    # Register Socket.IO namespaces
+    for namespace in all_namespaces:
+        socketio.on_namespace(namespace)
+
     # Serve frontend static assets from dist/assets
     @app.route('/assets/<path:filename>')
     def serve_frontend_assets(filename):
@@ -57,18 +75,37 @@ def create_app(config_name=None):
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve_spa(path):
-        if path.startswith('api/') or path.startswith('static/') or path.startswith('poker/'):
+        if path.startswith(('api/', 'static/', 'poker/', 'socket.io/')):
             return jsonify({'error': 'Not found'}), 404
         return send_from_directory(FRONTEND_DIST, 'index.html')
 
     # Initialize database
     with app.app_context():
+        init_sqlite_pragmas(app)
         init_db(app)
 
     logger.info(f'Helix app created with {config_name} configuration')
     return app
 
 
+def init_sqlite_pragmas(app):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection."""
+    from sqlalchemy import event
+
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas or db.engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(db.engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    logger.info(f'SQLite pragmas enabled: {pragmas}')
+
+
 def init_db(app):
     """Initialize the database with default data."""
     from models import User
@@ -87,12 +124,82 @@ def init_db(app):
                 if 'check_out_day' not in columns:
                     conn.execute(text("ALTER TABLE travel_itineraries ADD COLUMN check_out_day INTEGER"))
                     logger.info('Added check_out_day column to travel_itineraries')
+                if 'route_status' not in columns:
+                    conn.execute(text("ALTER TABLE travel_itineraries ADD COLUMN route_status VARCHAR(20)"))
+                    logger.info('Added route_status column to travel_itineraries')
+                if 'route_origin' not in columns:
+                    conn.execute(text("ALTER TABLE travel_itineraries ADD COLUMN route_origin VARCHAR(50)"))
+                    conn.execute(text("ALTER TABLE travel_itineraries ADD COLUMN route_destination VARCHAR(50)"))
+                    logger.info('Added route_origin/route_destination columns to travel_itineraries')
                 # Migrate legacy 'flight' category to 'transport'
                 conn.execute(text("UPDATE travel_itineraries SET category='transport' WHERE category='flight'"))
                 conn.commit()
         except Exception as e:
             logger.warning(f'Migration check skipped: {e}')
 
+        # Auto-migration: add reaction_version to chat_message (incremental chat sync)
+        try:
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(chat_message)"))]
+            if columns and 'reaction_version' not in columns:
+                conn.execute(text("ALTER TABLE chat_message ADD COLUMN reaction_version INTEGER NOT NULL DEFAULT 0"))
+                conn.commit()
+                logger.info('Added reaction_version column to chat_message')
+        except Exception as e:
+            logger.warning(f'Migration check skipped: {e}')
+
+        # Auto-migration: add hole_cards to poker_hands (replayable hand history)
+        try:
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(poker_hands)"))]
+            if columns and 'hole_cards' not in columns:
+                conn.execute(text("ALTER TABLE poker_hands ADD COLUMN hole_cards TEXT"))
+                conn.commit()
+                logger.info('Added hole_cards column to poker_hands')
+        except Exception as e:
+            logger.warning(f'Migration check skipped: {e}')
+
+        # Auto-migration: add first/min/max columns to the asset history rollups
+        # (rows without them are rebuilt from the daily history below)
+        for table in ('asset_history_rollup', 'asset_category_history_rollup'):
+            try:
+                columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+                if columns and 'max_value' not in columns:
+                    for column, column_type in (('first_date', 'DATE'), ('first_value', 'FLOAT'),
+                                                ('min_date', 'DATE'), ('min_value', 'FLOAT'),
+                                                ('max_date', 'DATE'), ('max_value', 'FLOAT')):
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                    conn.commit()
+                    logger.info(f'Added first/min/max columns to {table}')
+            except Exception as e:
+                logger.warning(f'Migration check skipped: {e}')
+
+    # Auto-migration: create indexes declared in models on existing tables
+    # (create_all only adds indexes for newly created tables)
+    with db.engine.connect() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=conn, checkfirst=True)
+                except Exception as e:
+                    logger.warning(f'Index {index.name} skipped: {e}')
+        conn.commit()
+
+    # Bring today's asset history in line with the Asset table (routes maintain it incrementally)
+    from models import AssetHistory, AssetHistoryRollup
+    from app.routes.assets import reconcile_asset_history, rebuild_asset_rollups
+    try:
+        if AssetHistory.query.first() is not None and (
+            AssetHistoryRollup.query.first() is None
+            or AssetHistoryRollup.query.filter(AssetHistoryRollup.max_date.is_(None)).first() is not None
+        ):
+            total_rows, category_rows = rebuild_asset_rollups()
+            logger.info(f'Asset history rollups built: {total_rows} total rows, {category_rows} category rows')
+        changes, total_change = reconcile_asset_history()
+        if changes or total_change:
+            logger.info(f'Asset history reconciled: {changes}, total {total_change:+.2f}')
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f'Asset history reconcile skipped: {e}')
+
     # Create initial users if not exist
     if User.query.count() == 0:
         user1 = User(username='一二')
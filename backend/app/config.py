@@ -8,6 +8,8 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
     SQLALCHEMY_DATABASE_URI = 'sqlite:///helix.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLITE_PRAGMAS = {}  # 每个新连接执行的 PRAGMA
 
     # AI服务配置 - 通义千问 (Qwen)
     # 申请地址: https://dashscope.console.aliyun.com/
@@ -17,6 +19,20 @@ class Config:
     # 高德地图API配置
     # 申请地址: https://lbs.amap.com/dev/key/app
     AMAP_API_KEY = os.environ.get('AMAP_API_KEY', '696a8bac3cd37428b5bd82a6334cc586')
+    # 高德代理接口的响应缓存（SQLite 文件，默认 instance/amap_cache.db），条目数为 0 表示关闭
+    AMAP_CACHE_PATH = os.environ.get('AMAP_CACHE_PATH')
+    AMAP_CACHE_MAX_ENTRIES = int(os.environ.get('AMAP_CACHE_MAX_ENTRIES', 5000))
+
+    # 外部 HTTP 调用（高德、DashScope）: 连接池复用连接，连接错误和 429/5xx 按抖动退避重试
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+    AMAP_READ_TIMEOUT = float(os.environ.get('AMAP_READ_TIMEOUT', 10))
+    DASHSCOPE_READ_TIMEOUT = float(os.environ.get('DASHSCOPE_READ_TIMEOUT', 60))
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))  # 每个主机的最大保持连接数
+
+    # 行程路线在后台线程计算（任务保存在 travel_route_jobs 表），0 表示在请求内同步计算
+    TRAVEL_ROUTE_WORKERS = int(os.environ.get('TRAVEL_ROUTE_WORKERS', 2))
 
     # Session cookie settings for cross-origin requests
     SESSION_COOKIE_SAMESITE = 'None'
@@ -31,6 +47,23 @@ class Config:
     # Static files cache
     SEND_FILE_MAX_AGE_DEFAULT = timedelta(days=1)
 
+    # Socket.IO (chat push). Multiple worker processes need a shared
+    # message queue, e.g. redis://localhost:6379/0
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE')  # None = auto (eventlet if installed)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+
+    # 德扑对局状态存储: 'memory'（单进程）、'sqlite'（多 worker 共享）、'redis'
+    POKER_STATE_BACKEND = os.environ.get('POKER_STATE_BACKEND', 'memory')
+    POKER_STATE_PATH = os.environ.get('POKER_STATE_PATH')  # 默认 instance/poker_state.db
+    POKER_STATE_URL = os.environ.get('POKER_STATE_URL')    # redis://localhost:6379/0
+    POKER_HISTORY_DIR = os.environ.get('POKER_HISTORY_DIR')  # 默认 instance/poker_history
+    # memory 存储的淘汰策略: 活动对局上限、空闲超时（秒），未结束的对局换出到 POKER_STATE_PATH
+    POKER_MAX_LIVE_GAMES = int(os.environ.get('POKER_MAX_LIVE_GAMES', 200))
+    POKER_IDLE_TTL = int(os.environ.get('POKER_IDLE_TTL', 6 * 3600))
+    POKER_FINISHED_TTL = int(os.environ.get('POKER_FINISHED_TTL', 600))
+    # sqlite 存储（含 memory 的换出文件）中超过该时长（秒）未更新的对局被清理，已结束的对局超过 POKER_FINISHED_TTL 清理
+    POKER_STATE_EXPIRE = int(os.environ.get('POKER_STATE_EXPIRE', 7 * 86400))
+
     # CORS origins
     CORS_ORIGINS = [
         'http://localhost:1420',
@@ -53,11 +86,32 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
 
+    # WAL: 写入不阻塞并发读，多个 gunicorn worker 共享同一个数据库文件
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',   # WAL 下安全且比 FULL 少一次 fsync
+        'busy_timeout': 5000,      # 写锁被占用时等待 5s 而不是立即 "database is locked"
+        'cache_size': -64000,      # 64MB 页缓存（负数单位为 KiB）
+        'mmap_size': 268435456,    # 256MB 内存映射读
+        'temp_store': 'MEMORY',
+    }
+    POKER_STATE_BACKEND = os.environ.get('POKER_STATE_BACKEND', 'sqlite')
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+        'connect_args': {'timeout': 30, 'check_same_thread': False},
+    }
+
 
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AMAP_CACHE_PATH = ':memory:'
+    TRAVEL_ROUTE_WORKERS = 0
 
 
 config = {
@@ -1,9 +1,11 @@
 """Flask extensions initialization."""
 from flask_cors import CORS
+from flask_socketio import SocketIO
 
 # Import db from models to ensure single instance
 from models import db
 
 cors = CORS()
+socketio = SocketIO()
 
-__all__ = ['db', 'cors']
+__all__ = ['db', 'cors', 'socketio']
@@ -0,0 +1,99 @@
+"""
+翻牌后胜率估算 - 蒙特卡洛模拟
+
+对给定手牌和公共牌，随机发出剩余公共牌和 n 个对手的手牌，统计胜率（平分按人数分摊）。
+结果按 (手牌, 公共牌, 对手数) 做 LRU 缓存；单次估算受迭代次数和时间预算双重限制，
+保证 ai_step 的延迟可控。
+
+每个键使用由牌面派生的固定种子，关闭时间预算（TIME_BUDGET = 0）后同样的输入结果可复现。
+"""
+
+import random
+import time
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+from texasholdem.card import Card
+from texasholdem.card.deck import Deck
+from texasholdem.evaluator import evaluate
+
+MAX_ITERATIONS = 600      # 单次估算的最大模拟次数
+MIN_ITERATIONS = 64       # 时间预算耗尽前至少完成的次数
+TIME_BUDGET = 0.02        # 单次估算的时间预算（秒），0 表示只受迭代次数限制（结果可复现）
+CACHE_SIZE = 4096
+_CHECK_EVERY = 16         # 每隔多少次检查一次时间
+
+_FULL_DECK: Tuple[Card, ...] = tuple(Deck._get_full_deck())
+
+
+def _simulate(hand: Tuple[Card, ...], board: Tuple[Card, ...], n_opponents: int,
+              max_iterations: int, time_budget: Optional[float]) -> float:
+    used = set(hand) | set(board)
+    remaining = [c for c in _FULL_DECK if c not in used]
+    board_needed = 5 - len(board)
+    draw = board_needed + 2 * n_opponents
+    hand_list, board_list = list(hand), list(board)
+
+    rng = random.Random(hash((hand, board, n_opponents)))
+    deadline = time.perf_counter() + time_budget if time_budget else None
+
+    # 河牌圈公共牌已定，自己的牌力只需计算一次
+    river_rank = evaluate(hand_list, board_list) if board_needed == 0 else None
+
+    share = 0.0
+    iterations = 0
+    while iterations < max_iterations:
+        sample = rng.sample(remaining, draw)
+        full_board = board_list + sample[:board_needed] if board_needed else board_list
+        my_rank = river_rank if river_rank is not None else evaluate(hand_list, full_board)
+
+        ties = 1
+        for k in range(board_needed, draw, 2):
+            rank = evaluate(sample[k:k + 2], full_board)
+            if rank < my_rank:
+                break
+            if rank == my_rank:
+                ties += 1
+        else:
+            share += 1.0 / ties
+
+        iterations += 1
+        if (deadline and iterations >= MIN_ITERATIONS and iterations % _CHECK_EVERY == 0
+                and time.perf_counter() > deadline):
+            break
+
+    return share / iterations
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_equity(hand: Tuple[Card, ...], board: Tuple[Card, ...], n_opponents: int,
+                   max_iterations: int, time_budget: Optional[float]) -> float:
+    return _simulate(hand, board, n_opponents, max_iterations, time_budget)
+
+
+def estimate_equity(hand: Iterable[Card], board: Iterable[Card], n_opponents: int,
+                    max_iterations: Optional[int] = None,
+                    time_budget: Optional[float] = None) -> float:
+    """估算手牌对 n_opponents 个随机对手的胜率（0-1），未指定的预算取模块默认值"""
+    if n_opponents <= 0:
+        return 1.0
+    if max_iterations is None:
+        max_iterations = MAX_ITERATIONS
+    if time_budget is None:
+        time_budget = TIME_BUDGET
+    key_hand = tuple(sorted(hand))
+    key_board = tuple(sorted(board))
+    return _cached_equity(key_hand, key_board, n_opponents, max_iterations, time_budget)
+
+
+def relative_strength(equity: float, n_opponents: int) -> float:
+    """胜率相对公平份额 1/(n+1) 的强度（0-1）: 0.5 为平均水平，单挑时等于胜率本身"""
+    return min(1.0, equity * (n_opponents + 1) / 2)
+
+
+def cache_info():
+    """缓存命中统计"""
+    return _cached_equity.cache_info()
+
+
+def clear_cache():
+    _cached_equity.cache_clear()
@@ -0,0 +1,528 @@
+"""
+德扑对局状态存储 - 可替换后端
+
+- MemoryGameStore: 进程内字典（默认，单进程部署），可按 LRU/TTL 把空闲对局换出到持久化存储
+- SQLiteGameStore: pickle 快照写入本地 SQLite 文件，多个 worker 共享、重启不丢
+- RedisGameStore: pickle 快照写入 Redis（需要安装 redis 包）
+
+共享存储的读取-修改-保存由 lock(game_id) 持有跨进程的对局锁（带租约），保存时按版本号
+条件更新：锁租约过期后被其他进程抢先保存时抛出 GameStateConflict，不会覆盖对方的修改。
+
+TexasHoldEm 内部持有生成器，无法直接 pickle。进行中的手牌保存为
+"开局快照 + 已执行动作"，加载时按 TexasHoldEm.copy() 的方式重放；
+手牌之间的状态则直接保存对象属性。
+"""
+
+import os
+import time
+import uuid
+import pickle
+import random
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+from texasholdem.game.game import TexasHoldEm
+from texasholdem.card.deck import Deck
+
+
+logger = logging.getLogger(__name__)
+
+# 不可序列化的 TexasHoldEm 属性（加载时由 __init__ 重建）
+_TRANSIENT_ATTRS = ('_hand_gen', '_handstate_handler')
+
+# 共享存储的对局锁
+LOCK_TTL = 30     # 租约时长（秒），持有者异常退出后到期自动释放
+LOCK_WAIT = 10    # 等待对局锁的最长时间（秒）
+
+
+class GameStateConflict(RuntimeError):
+    """对局正被其他 worker 修改（等待对局锁超时，或保存时版本号已变化）"""
+
+
+def snapshot_th_game(th: TexasHoldEm) -> Dict:
+    """把 TexasHoldEm 转成可 pickle 的快照"""
+    snap = {
+        'buyin': th.buyin,
+        'big_blind': th.big_blind,
+        'small_blind': th.small_blind,
+        'max_players': th.max_players,
+        'num_hands': th.num_hands,
+        'hand_running': th.is_hand_running(),
+    }
+    if not snap['hand_running']:
+        snap['attrs'] = {k: v for k, v in th.__dict__.items() if k not in _TRANSIENT_ATTRS}
+        return snap
+
+    # 进行中的手牌：保存重放所需的信息
+    snap['hand_history'] = th.hand_history
+    snap['hands'] = {i: list(cards) for i, cards in th.hands.items()}
+    snap['deck'] = list(th._deck.cards)
+    return snap
+
+
+def restore_th_game(snap: Dict) -> TexasHoldEm:
+    """从快照恢复 TexasHoldEm（与 TexasHoldEm.copy(shuffle=False) 相同的重放方式）"""
+    th = TexasHoldEm(
+        buyin=snap['buyin'],
+        big_blind=snap['big_blind'],
+        small_blind=snap['small_blind'],
+        max_players=snap['max_players'],
+    )
+
+    if not snap['hand_running']:
+        th.__dict__.update(snap['attrs'])
+        th._hand_gen = None
+        return th
+
+    history = snap['hand_history']
+
+    # 按钮放在原按钮前一位，start_hand 会轮转到原按钮
+    th.btn_loc = (history.prehand.btn_loc - 1) % th.max_players
+    for i, chips in history.prehand.player_chips.items():
+        th.players[i].chips = chips
+
+    # 还原牌堆：已发出的公共牌 + 剩余牌
+    deck = Deck()
+    deck.cards = list(snap['deck'])
+    actions = []
+    for bet_round in (history.river, history.turn, history.flop, history.preflop):
+        if bet_round:
+            deck.cards = list(bet_round.new_cards) + deck.cards
+            for action in reversed(bet_round.actions):
+                actions.insert(0, (action.player_id, action.action_type, action.total))
+
+    th.start_hand()
+    for i, cards in snap['hands'].items():
+        th.hands[i] = list(cards)
+    th._deck = deck
+
+    for player_id, action_type, total in actions:
+        if player_id != th.current_player:
+            raise ValueError(f'Replay mismatch: expected player {th.current_player}, got {player_id}')
+        th.take_action(action_type, total=total)
+
+    th.num_hands = snap['num_hands']
+    return th
+
+
+def dumps_game(g: Dict) -> bytes:
+    """序列化对局记录（th_game + 簿记字典）"""
+    record = dict(g)
+    record.pop('_version', None)  # 版本号由存储单独保存
+    record['th_game'] = snapshot_th_game(g['th_game'])
+    return pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads_game(data: bytes) -> Dict:
+    """反序列化对局记录"""
+    record = pickle.loads(data)
+    record['th_game'] = restore_th_game(record['th_game'])
+    return record
+
+
+class MemoryGameStore:
+    """进程内存储 - 直接保存活动对象
+
+    可选淘汰策略: 超过 max_games 时淘汰最久未访问的对局，空闲超过 idle_ttl 秒
+    （已结束的对局为 finished_ttl 秒）的对局也会被淘汰。未结束的对局写入 spill
+    存储，下次 get 时加载回内存；已结束的对局直接丢弃（手牌记录已落库），
+    所以 finished_ttl 到期前不作为容量淘汰对象，客户端仍能读取最后一手。
+
+    game_lock 为 PokerManager 的对局锁：只淘汰能立即拿到锁的对局，换出期间一直持有，
+    正在被其他线程修改的对局不会被序列化。
+    """
+
+    SWEEP_INTERVAL = 60  # TTL 扫描间隔（秒）
+
+    def __init__(self, spill=None, max_games: Optional[int] = None,
+                 idle_ttl: Optional[float] = None, finished_ttl: Optional[float] = None):
+        self._games: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._touched: Dict[int, float] = {}
+        self._sizes: Dict[int, tuple] = {}  # game_id -> (手牌序号, 快照字节数)，每手牌测量一次
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        self.game_lock = None  # game_id -> 对局锁，由 PokerManager 设置
+        self.spill = spill
+        self.max_games = max_games
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.evictions = 0
+        self.rehydrations = 0
+        self._last_sweep = time.monotonic()
+
+    def get(self, game_id: int) -> Optional[Dict]:
+        with self._lock:
+            g = self._games.get(game_id)
+            if g is not None:
+                self._games.move_to_end(game_id)
+                self._touched[game_id] = time.monotonic()
+                return g
+        if self.spill is None:
+            return None
+
+        # 被淘汰的对局: 从 spill 加载回内存（put 删除 spill 中的快照）
+        g = self.spill.get(game_id)
+        if g is not None:
+            g.pop('_version', None)
+            self.rehydrations += 1
+            self.put(game_id, g)
+        return g
+
+    def put(self, game_id: int, g: Dict):
+        with self._lock:
+            resident = game_id in self._games
+            self._games[game_id] = g
+            self._games.move_to_end(game_id)
+            self._touched[game_id] = time.monotonic()
+        if not resident and self.spill is not None:
+            # 对局回到内存后 spill 中的快照即已过期，之后淘汰时不能再被加载回来
+            self.spill.delete(game_id)
+        self._track_size(game_id, g)
+        self._evict()
+
+    def delete(self, game_id: int):
+        with self._lock:
+            self._games.pop(game_id, None)
+            self._touched.pop(game_id, None)
+            self._forget_size(game_id)
+        if self.spill is not None:
+            self.spill.delete(game_id)
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._games or (self.spill is not None and game_id in self.spill)
+
+    def lock(self, game_id: int):
+        """单进程存储，PokerManager 的进程内对局锁已足够"""
+        return nullcontext()
+
+    def _track_size(self, game_id: int, g: Dict):
+        """对局快照大小的估算: 新对局和每手新牌时测量一次，stats 直接汇总"""
+        known = self._sizes.get(game_id)
+        if known is not None and known[0] == g.get('hand_number'):
+            return
+        try:
+            size = len(dumps_game(g))
+        except Exception:
+            return
+        with self._lock:
+            if game_id in self._games:
+                self._forget_size(game_id)
+                self._sizes[game_id] = (g.get('hand_number'), size)
+                self._memory_bytes += size
+
+    def _forget_size(self, game_id: int):
+        known = self._sizes.pop(game_id, None)
+        if known is not None:
+            self._memory_bytes -= known[1]
+
+    def _evict(self):
+        """淘汰超出容量和空闲超时的对局"""
+        now = time.monotonic()
+        candidates = []
+        with self._lock:
+            if self.max_games and len(self._games) > self.max_games:
+                excess = len(self._games) - self.max_games
+                # 最久未访问的在前；刚访问的对局不淘汰，容量被未到期的已结束对局占满时暂时超出上限
+                for game_id in list(self._games)[:-1]:
+                    if len(candidates) >= excess:
+                        break
+                    g = self._games[game_id]
+                    if (g.get('is_game_over') and self.finished_ttl is not None
+                            and now - self._touched.get(game_id, now) <= self.finished_ttl):
+                        continue
+                    candidates.append(game_id)
+
+            if now - self._last_sweep >= self.SWEEP_INTERVAL:
+                self._last_sweep = now
+                for game_id, g in self._games.items():
+                    ttl = self.finished_ttl if g.get('is_game_over') else self.idle_ttl
+                    if ttl is not None and now - self._touched.get(game_id, now) > ttl and game_id not in candidates:
+                        candidates.append(game_id)
+
+        for game_id in candidates:
+            lock = self.game_lock(game_id) if self.game_lock else threading.Lock()
+            # 拿不到锁说明对局正在被使用，本轮不淘汰
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with self._lock:
+                    g = self._games.pop(game_id, None)
+                    self._touched.pop(game_id, None)
+                    self._forget_size(game_id)
+                if g is not None:
+                    self._spill(game_id, g)
+            finally:
+                lock.release()
+
+    def _spill(self, game_id: int, g: Dict):
+        self.evictions += 1
+        if self.spill is None:
+            return
+        if g.get('is_game_over'):
+            # 已结束的对局直接丢弃，同时删除可能残留的旧快照，避免加载回未结束的状态
+            self.spill.delete(game_id)
+            return
+        try:
+            self.spill.put(game_id, g)
+        except Exception as e:
+            # 写入失败时保留在内存中，避免丢失进行中的对局
+            logger.warning(f'Failed to spill poker game {game_id}: {e}')
+            with self._lock:
+                self._games[game_id] = g
+                self._touched[game_id] = time.monotonic()
+
+    def stats(self) -> Dict:
+        """活动对局数和内存估算（按快照字节数估算，保存时增量维护）"""
+        with self._lock:
+            stats = {
+                'backend': 'memory',
+                'live_games': len(self._games),
+                'finished_games': sum(1 for g in self._games.values() if g.get('is_game_over')),
+                'memory_bytes': self._memory_bytes,
+                'max_games': self.max_games,
+                'evictions': self.evictions,
+                'rehydrations': self.rehydrations,
+            }
+        if self.spill is not None:
+            stats['spilled_games'] = self.spill.stats()['stored_games']
+        return stats
+
+
+class SQLiteGameStore:
+    """SQLite 存储 - 每局一行 pickle 快照，多进程共享
+
+    对局锁为 poker_game_locks 表中的租约行；快照行带版本号，保存时条件更新。
+    保存时每 PURGE_INTERVAL 秒清理一次: 已结束超过 finished_ttl 秒、或超过 expire_ttl 秒
+    未更新的对局（未被持有锁的）。
+    """
+
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path: str, finished_ttl: Optional[float] = None, expire_ttl: Optional[float] = None):
+        self.path = path
+        self.finished_ttl = finished_ttl
+        self.expire_ttl = expire_ttl
+        self._last_purge = time.monotonic()
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS poker_game_states ('
+                'game_id INTEGER PRIMARY KEY, '
+                'state BLOB NOT NULL, '
+                'version INTEGER NOT NULL DEFAULT 1, '
+                'finished INTEGER NOT NULL DEFAULT 0, '
+                "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            )
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(poker_game_states)')]
+            if 'version' not in columns:
+                conn.execute('ALTER TABLE poker_game_states ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+            if 'finished' not in columns:
+                conn.execute('ALTER TABLE poker_game_states ADD COLUMN finished INTEGER NOT NULL DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_poker_game_states_updated_at ON poker_game_states (updated_at)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS poker_game_locks ('
+                'game_id INTEGER PRIMARY KEY, '
+                'owner TEXT NOT NULL, '
+                'expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def lock(self, game_id: int):
+        """跨进程的对局锁（不可重入）：插入租约行，已被持有且未到期时重试，超过 LOCK_WAIT 抛出 GameStateConflict"""
+        conn = self._connect()
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_WAIT
+        while True:
+            now = time.time()
+            with conn:
+                acquired = conn.execute(
+                    'INSERT INTO poker_game_locks (game_id, owner, expires_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(game_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                    'WHERE poker_game_locks.expires_at < ?',
+                    (game_id, owner, now + LOCK_TTL, now)
+                ).rowcount
+            if acquired:
+                break
+            if time.monotonic() >= deadline:
+                raise GameStateConflict(f'Poker game {game_id} is locked by another worker')
+            time.sleep(random.uniform(0.005, 0.02))
+        try:
+            yield
+        finally:
+            with conn:
+                conn.execute('DELETE FROM poker_game_locks WHERE game_id = ? AND owner = ?', (game_id, owner))
+
+    def get(self, game_id: int) -> Optional[Dict]:
+        row = self._connect().execute(
+            'SELECT state, version FROM poker_game_states WHERE game_id = ?', (game_id,)
+        ).fetchone()
+        if not row:
+            return None
+        g = loads_game(row[0])
+        g['_version'] = row[1]
+        return g
+
+    def put(self, game_id: int, g: Dict):
+        """新对局插入，已加载的对局按读取时的版本号条件更新，版本已变化时抛出 GameStateConflict"""
+        data = sqlite3.Binary(dumps_game(g))
+        finished = 1 if g.get('is_game_over') else 0
+        version = g.get('_version')
+        try:
+            with self._connect() as conn:
+                if version is None:
+                    updated = conn.execute(
+                        'INSERT INTO poker_game_states (game_id, state, version, finished, updated_at) '
+                        'VALUES (?, ?, 1, ?, CURRENT_TIMESTAMP)',
+                        (game_id, data, finished)
+                    ).rowcount
+                else:
+                    updated = conn.execute(
+                        'UPDATE poker_game_states SET state = ?, version = version + 1, finished = ?, '
+                        'updated_at = CURRENT_TIMESTAMP WHERE game_id = ? AND version = ?',
+                        (data, finished, game_id, version)
+                    ).rowcount
+        except sqlite3.IntegrityError:
+            updated = 0
+        if not updated:
+            raise GameStateConflict(f'Poker game {game_id} was modified by another worker')
+        g['_version'] = (version or 0) + 1
+
+        if time.monotonic() - self._last_purge >= self.PURGE_INTERVAL:
+            self._last_purge = time.monotonic()
+            self.purge()
+
+    def purge(self) -> int:
+        """删除已结束超过 finished_ttl 秒、或超过 expire_ttl 秒未更新且未被持有锁的对局，返回删除数"""
+        conditions, params = [], []
+        if self.finished_ttl is not None:
+            conditions.append("(finished = 1 AND updated_at < datetime('now', ?))")
+            params.append(f'-{int(self.finished_ttl)} seconds')
+        if self.expire_ttl is not None:
+            conditions.append("updated_at < datetime('now', ?)")
+            params.append(f'-{int(self.expire_ttl)} seconds')
+        if not conditions:
+            return 0
+        try:
+            with self._connect() as conn:
+                return conn.execute(
+                    f"DELETE FROM poker_game_states WHERE ({' OR '.join(conditions)}) "
+                    'AND game_id NOT IN (SELECT game_id FROM poker_game_locks WHERE expires_at >= ?)',
+                    (*params, time.time())
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f'Poker state purge failed: {e}')
+            return 0
+
+    def delete(self, game_id: int):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM poker_game_states WHERE game_id = ?', (game_id,))
+            conn.execute('DELETE FROM poker_game_locks WHERE game_id = ? AND expires_at < ?', (game_id, time.time()))
+
+    def __contains__(self, game_id: int) -> bool:
+        return self._connect().execute(
+            'SELECT 1 FROM poker_game_states WHERE game_id = ?', (game_id,)
+        ).fetchone() is not None
+
+    def stats(self) -> Dict:
+        count, size = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM poker_game_states'
+        ).fetchone()
+        return {'backend': 'sqlite', 'live_games': 0, 'stored_games': count, 'stored_bytes': size}
+
+
+class RedisGameStore:
+    """Redis 存储 - 适合多台机器或已部署 Redis 的环境
+
+    每局一个 hash（state + version）；对局锁为 redis-py 的 Lock（SET NX + 过期时间），
+    保存时 WATCH 版本号，在 MULTI 中写入。
+    """
+
+    def __init__(self, url: str, prefix: str = 'helix:poker:state:'):
+        import redis  # 可选依赖
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._watch_error = redis.WatchError
+
+    def _key(self, game_id: int) -> str:
+        return f'{self.prefix}{game_id}'
+
+    @contextmanager
+    def lock(self, game_id: int):
+        lock = self.client.lock(f'{self._key(game_id)}:lock', timeout=LOCK_TTL, blocking_timeout=LOCK_WAIT)
+        if not lock.acquire():
+            raise GameStateConflict(f'Poker game {game_id} is locked by another worker')
+        try:
+            yield
+        finally:
+            try:
+                lock.release()
+            except Exception as e:
+                # 租约已过期（被其他 worker 重新获取），版本号检查会拒绝本次之后的写入
+                logger.warning(f'Poker game {game_id} lock release failed: {e}')
+
+    def get(self, game_id: int) -> Optional[Dict]:
+        data, version = self.client.hmget(self._key(game_id), 'state', 'version')
+        if not data:
+            return None
+        g = loads_game(data)
+        g['_version'] = int(version)
+        return g
+
+    def put(self, game_id: int, g: Dict):
+        """与 SQLiteGameStore.put 相同的版本号语义，WATCH 期间版本变化时抛出 GameStateConflict"""
+        key = self._key(game_id)
+        data = dumps_game(g)
+        version = g.get('_version')
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current = pipe.hget(key, 'version')
+                if (int(current) if current is not None else None) != version:
+                    raise GameStateConflict(f'Poker game {game_id} was modified by another worker')
+                pipe.multi()
+                pipe.hset(key, mapping={'state': data, 'version': (version or 0) + 1})
+                pipe.execute()
+            except self._watch_error:
+                raise GameStateConflict(f'Poker game {game_id} was modified by another worker')
+        g['_version'] = (version or 0) + 1
+
+    def delete(self, game_id: int):
+        self.client.delete(self._key(game_id))
+
+    def __contains__(self, game_id: int) -> bool:
+        return bool(self.client.exists(self._key(game_id)))
+
+    def stats(self) -> Dict:
+        count = sum(1 for key in self.client.scan_iter(match=f'{self.prefix}*') if not key.endswith(b':lock'))
+        return {'backend': 'redis', 'live_games': 0, 'stored_games': count}
+
+
+def create_game_store(backend: str = 'memory', path: str = None, url: str = None,
+                      max_games: int = None, idle_ttl: float = None, finished_ttl: float = None,
+                      expire_ttl: float = None):
+    """按配置创建存储后端；内存存储启用淘汰时，未结束的对局换出到 path 指定的 SQLite 文件
+
+    SQLite 中已结束超过 finished_ttl 秒、或超过 expire_ttl 秒未更新的对局会被定期清理。
+    """
+    if backend == 'sqlite':
+        return SQLiteGameStore(path or 'poker_state.db', finished_ttl, expire_ttl)
+    if backend == 'redis':
+        return RedisGameStore(url or 'redis://localhost:6379/0')
+    if max_games or idle_ttl or finished_ttl:
+        return MemoryGameStore(SQLiteGameStore(path or 'poker_state.db', finished_ttl, expire_ttl),
+                               max_games, idle_ttl, finished_ttl)
+    return MemoryGameStore()
@@ -0,0 +1,416 @@
+"""
+德扑手牌历史 - 紧凑二进制编码 + 每局一个追加写日志文件
+
+每手牌编码为一条记录（文件中为 varint 长度 + 记录体）:
+
+    version u8 | hand_number varint | finished_at varint(unix 秒)
+    n_players u8 | btn u8 | sb u8 | bb u8 | small_blind varint | big_blind varint
+    开局筹码 varint * n | 结束筹码 varint * n | 底牌 2 * u8 * n（无牌为 0xFF）
+    公共牌 u8 数量 + u8 * 数量
+    动作 varint 数量，每个动作 u8 头（高 4 位操作码，低 4 位座位）+ 投入筹码 varint（盲注/跟注/加注/ALL IN）
+        操作码 STREET 表示进入新的下注轮，低 4 位为下注轮序号
+    底池 u8 数量，每个底池 varint 金额 | varint 牌力（0 为无人摊牌）| u8 胜者位图
+
+牌编码为 rank * 4 + 花色序号（0-51）。一手 6 人牌通常 60-100 字节，不到同样内容 JSON 的 1/10；
+按手牌序号查找时使用每局的偏移索引（只增量扫描新追加记录的长度和序号），然后只读取目标记录。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from texasholdem.card import Card
+from texasholdem.card.deck import Deck
+from texasholdem.evaluator import rank_to_string
+from texasholdem.game.action_type import ActionType
+from texasholdem.game.game import TexasHoldEm
+
+FORMAT_VERSION = 1
+NO_CARD = 0xFF
+
+# 操作码
+OPCODES = ('small_blind', 'big_blind', 'fold', 'check', 'call', 'raise', 'all_in')
+STREET = 7
+ROUNDS = ('preflop', 'flop', 'turn', 'river')
+_OPCODE_INDEX = {name: i for i, name in enumerate(OPCODES)}
+_AMOUNT_OPCODES = {0, 1, 4, 5, 6}
+
+_SUITS = {1: 0, 2: 1, 4: 2, 8: 3}
+_CARDS = {card.rank * 4 + _SUITS[card.suit]: str(card) for card in Deck._get_full_deck()}
+
+
+def rank_label(rank: int) -> Optional[str]:
+    """牌力值对应的牌型名称（如 'full_house'），无效值返回 None"""
+    if 0 < rank <= 7462:
+        return rank_to_string(rank).lower().replace(' ', '_')
+    return None
+
+
+def action_label(action_type: ActionType, amount: Optional[int] = None) -> str:
+    """动作的显示名称（加注时 amount 为加注到的总额）"""
+    return {
+        ActionType.FOLD: '弃牌',
+        ActionType.CHECK: '过牌',
+        ActionType.CALL: '跟注',
+        ActionType.RAISE: f'加注到{amount}' if amount else '加注',
+        ActionType.ALL_IN: 'ALL IN',
+    }.get(action_type, str(action_type))
+
+
+# ---- varint ----
+
+def _put_varint(out: bytearray, value: int):
+    value = max(int(value), 0)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data: bytes, pos: int) -> tuple:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_varint(f) -> Optional[int]:
+    """从文件读取一个 varint，文件在中途结束时返回 None"""
+    result = shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        result |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return result
+        shift += 7
+
+
+def _card_code(card: Card) -> int:
+    return card.rank * 4 + _SUITS[card.suit]
+
+
+# ---- 编码 / 解码 ----
+
+def encode_hand(th: TexasHoldEm, hand_number: int, actions: List[Dict]) -> bytes:
+    """把刚结束的一手牌编码为记录体；actions 为 PokerManager 的本手动作缓冲区"""
+    history = th.hand_history
+    n = th.max_players
+    out = bytearray((FORMAT_VERSION,))
+    _put_varint(out, hand_number)
+    _put_varint(out, int(time.time()))
+    out += bytes((n, history.prehand.btn_loc, th.sb_loc, th.bb_loc))
+    _put_varint(out, th.small_blind)
+    _put_varint(out, th.big_blind)
+
+    for i in range(n):
+        _put_varint(out, history.prehand.player_chips.get(i, 0))
+    for i in range(n):
+        _put_varint(out, th.players[i].chips)
+    for i in range(n):
+        cards = history.prehand.player_cards.get(i) or []
+        out += bytes(_card_code(c) for c in cards[:2]) if len(cards) >= 2 else bytes((NO_CARD, NO_CARD))
+
+    board = th.board or []
+    out.append(len(board))
+    out += bytes(_card_code(c) for c in board)
+
+    # 动作（下注轮变化时插入 STREET 标记）
+    body = bytearray()
+    count = 0
+    current_round = 'preflop'
+    for action in actions:
+        if action['betting_round'] != current_round and action['betting_round'] in ROUNDS:
+            current_round = action['betting_round']
+            body.append((STREET << 4) | ROUNDS.index(current_round))
+            count += 1
+        opcode = _OPCODE_INDEX[action['action_type']]
+        body.append((opcode << 4) | action['position'])
+        if opcode in _AMOUNT_OPCODES:
+            _put_varint(body, action['amount'])
+        count += 1
+    _put_varint(out, count)
+    out += body
+
+    pots = history.settle.pot_winners if history.settle else {}
+    out.append(len(pots))
+    for amount, rank, winners in pots.values():
+        _put_varint(out, amount)
+        _put_varint(out, rank if rank_label(rank) else 0)
+        out.append(sum(1 << w for w in winners))
+
+    return bytes(out)
+
+
+def decode_hand(data: bytes) -> Dict:
+    """解码记录体"""
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f'Unsupported hand record version {data[0]}')
+    hand_number, pos = _get_varint(data, 1)
+    finished_at, pos = _get_varint(data, pos)
+    n, btn, sb, bb = data[pos:pos + 4]
+    pos += 4
+    small_blind, pos = _get_varint(data, pos)
+    big_blind, pos = _get_varint(data, pos)
+
+    start_chips, end_chips = [], []
+    for chips in (start_chips, end_chips):
+        for _ in range(n):
+            value, pos = _get_varint(data, pos)
+            chips.append(value)
+
+    hole_cards = {}
+    for i in range(n):
+        c1, c2 = data[pos], data[pos + 1]
+        pos += 2
+        hole_cards[i] = '' if c1 == NO_CARD else f'{_CARDS[c1]} {_CARDS[c2]}'
+
+    board_len = data[pos]
+    board = [_CARDS[c] for c in data[pos + 1:pos + 1 + board_len]]
+    pos += 1 + board_len
+
+    count, pos = _get_varint(data, pos)
+    actions = []
+    current_round = 'preflop'
+    for _ in range(count):
+        header = data[pos]
+        pos += 1
+        opcode, low = header >> 4, header & 0x0F
+        if opcode == STREET:
+            current_round = ROUNDS[low]
+            continue
+        amount = 0
+        if opcode in _AMOUNT_OPCODES:
+            amount, pos = _get_varint(data, pos)
+        actions.append({'position': low, 'action_type': OPCODES[opcode],
+                        'amount': amount, 'betting_round': current_round})
+
+    pot_count = data[pos]
+    pos += 1
+    pots = []
+    for _ in range(pot_count):
+        amount, pos = _get_varint(data, pos)
+        rank, pos = _get_varint(data, pos)
+        mask = data[pos]
+        pos += 1
+        pots.append((amount, rank, [i for i in range(n) if mask & (1 << i)]))
+
+    return {
+        'hand_number': hand_number,
+        'finished_at': datetime.utcfromtimestamp(finished_at).isoformat(),
+        'dealer_position': btn,
+        'sb_position': sb,
+        'bb_position': bb,
+        'small_blind': small_blind,
+        'big_blind': big_blind,
+        'start_chips': start_chips,
+        'end_chips': end_chips,
+        'hole_cards': hole_cards,
+        'board': board,
+        'actions': actions,
+        'pots': pots,
+    }
+
+
+def winner_info(record: Dict, names: List[str]) -> Dict:
+    """由记录构建与 PokerManager._finish_hand 相同结构的 winner_info"""
+    info = {
+        'winner_position': -1,
+        'winner_name': '',
+        'pot_won': 0,
+        'payoffs': [end - start for start, end in zip(record['start_chips'], record['end_chips'])],
+        'player_hands': dict(record['hole_cards']),
+        'public_cards': list(record['board']),
+    }
+    for amount, rank, winners in record['pots']:
+        if winners:
+            info['winner_position'] = winners[0]
+            info['pot_won'] = amount
+            if winners[0] < len(names):
+                info['winner_name'] = names[winners[0]]
+            break
+    return info
+
+
+def hand_result(record: Dict) -> str:
+    """获胜牌型（如 'full_house'），无人摊牌为 'uncontested'"""
+    for _, rank, winners in record['pots']:
+        if winners and rank_label(rank):
+            return rank_label(rank)
+    return 'uncontested'
+
+
+def last_action(action: Dict, raise_total: int = 0) -> Dict:
+    """把解码出的动作转为 PokerManager.last_action 结构"""
+    name = action['action_type']
+    if name in ('small_blind', 'big_blind'):
+        label = f"{'小盲' if name == 'small_blind' else '大盲'} {action['amount']}"
+        return {'player': action['position'], 'action': None, 'action_name': label}
+    action_type = ActionType[name.upper()]
+    return {
+        'player': action['position'],
+        'action': action_type.value,
+        'action_name': action_label(action_type, raise_total),
+    }
+
+
+_BOARD_SIZE = {'preflop': 0, 'flop': 3, 'turn': 4, 'river': 5}
+
+
+def replay_steps(record: Dict, names: List[str], round_names: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+    """逐步重放一手牌: start -> (street | action)* -> hand_over，每步附带当时的筹码、底池和公共牌"""
+    round_names = round_names or {}
+    n = len(record['start_chips'])
+    chips = list(record['start_chips'])
+    bets = [0] * n
+    pot = 0
+    board = record['board']
+    current_round = None
+
+    yield {
+        'type': 'start',
+        'hand_number': record['hand_number'],
+        'finished_at': record['finished_at'],
+        'dealer_position': record['dealer_position'],
+        'sb_position': record['sb_position'],
+        'bb_position': record['bb_position'],
+        'small_blind': record['small_blind'],
+        'big_blind': record['big_blind'],
+        'players': [{
+            'position': i,
+            'name': names[i] if i < len(names) else '',
+            'chips': chips[i],
+            'hand': record['hole_cards'].get(i, ''),
+        } for i in range(n)],
+    }
+
+    for action in record['actions']:
+        if action['betting_round'] != current_round:
+            current_round = action['betting_round']
+            bets = [0] * n
+            if current_round != 'preflop':
+                yield {
+                    'type': 'street',
+                    'round': round_names.get(current_round, current_round),
+                    'public_cards': ' '.join(board[:_BOARD_SIZE[current_round]]),
+                    'pot': pot,
+                }
+
+        position, amount = action['position'], action['amount']
+        chips[position] -= amount
+        bets[position] += amount
+        pot += amount
+        yield {
+            'type': 'action',
+            'round': round_names.get(current_round, current_round),
+            'last_action': last_action(action, bets[position]),
+            'amount': amount,
+            'chips': list(chips),
+            'pot': pot,
+            'public_cards': ' '.join(board[:_BOARD_SIZE[current_round]]),
+        }
+
+    yield {
+        'type': 'hand_over',
+        'winner_info': winner_info(record, names),
+        'hand_result': hand_result(record),
+        'chips': list(record['end_chips']),
+        'public_cards': ' '.join(board),
+    }
+
+
+# ---- 日志文件 ----
+
+class HandLog:
+    """每局一个追加写文件: {directory}/game_{id}.hhl，记录为 varint 长度 + 记录体
+
+    最近查询过的 INDEX_GAMES 局在内存中保存 {手牌序号: (偏移, 长度)} 索引，
+    之后只扫描文件新追加的部分；其他 worker 追加的记录同样会在下次查询时被扫描到。
+    """
+
+    INDEX_GAMES = 256
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._index = OrderedDict()  # game_id -> (inode, 已扫描到的偏移, {hand_number: (offset, length)})
+        self._index_lock = threading.Lock()
+
+    def _path(self, game_id: int) -> str:
+        return os.path.join(self.directory, f'game_{game_id}.hhl')
+
+    def append(self, game_id: int, record: bytes):
+        frame = bytearray()
+        _put_varint(frame, len(record))
+        frame += record
+        # O_APPEND 单次写入，多个 worker 同时追加也不会交错
+        with open(self._path(game_id), 'ab') as f:
+            f.write(frame)
+
+    def iter_records(self, game_id: int) -> Iterator[bytes]:
+        """按顺序逐条读取记录（流式读取，不把整个文件读入内存）"""
+        path = self._path(game_id)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            while True:
+                length = _read_varint(f)
+                if length is None:
+                    return
+                record = f.read(length)
+                if len(record) < length:  # 其他 worker 正在追加的记录
+                    return
+                yield record
+
+    def _hand_offsets(self, game_id: int) -> Dict[int, tuple]:
+        """更新并返回该局的手牌偏移索引"""
+        path = self._path(game_id)
+        with self._index_lock:
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                self._index.pop(game_id, None)
+                return {}
+            with f:
+                stat = os.fstat(f.fileno())
+                inode, scanned, hands = self._index.get(game_id, (None, 0, None))
+                if inode != stat.st_ino or scanned > stat.st_size:  # 文件被删除重建
+                    scanned, hands = 0, {}
+
+                f.seek(scanned)
+                while scanned < stat.st_size:
+                    length = _read_varint(f)
+                    offset = f.tell()
+                    if length is None or offset + length > stat.st_size:
+                        break
+                    header = f.read(min(length, 11))  # version + hand_number varint
+                    number, _ = _get_varint(header, 1)
+                    hands.setdefault(number, (offset, length))
+                    scanned = offset + length
+                    f.seek(scanned)
+
+            self._index[game_id] = (stat.st_ino, scanned, hands)
+            self._index.move_to_end(game_id)
+            while len(self._index) > self.INDEX_GAMES:
+                self._index.popitem(last=False)
+            return hands
+
+    def read_hand(self, game_id: int, hand_number: int) -> Optional[Dict]:
+        """通过偏移索引读取并解码指定手牌"""
+        location = self._hand_offsets(game_id).get(hand_number)
+        if location is None:
+            return None
+        offset, length = location
+        try:
+            with open(self._path(game_id), 'rb') as f:
+                f.seek(offset)
+                return decode_hand(f.read(length))
+        except FileNotFoundError:
+            return None
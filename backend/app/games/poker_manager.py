@@ -2,9 +2,14 @@
 基于 texasholdem 的德扑游戏管理器 - 8人桌
 """
 
+import os
 import random
+import logging
+import threading
+import functools
+import weakref
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from texasholdem.game.game import TexasHoldEm
 from texasholdem.game.action_type import ActionType
 from texasholdem.game.hand_phase import HandPhase
@@ -12,21 +17,21 @@ from texasholdem.game.player_state import PlayerState
 from texasholdem.agents.basic import call_agent, random_agent
 from texasholdem.evaluator import evaluate, get_five_card_rank_percentage
 from texasholdem.card import Card
+from .game_store import MemoryGameStore, create_game_store
+from .hand_log import HandLog, action_label, encode_hand, rank_label, replay_steps
+from .poker_persistence import DatabasePersistence, Seat
+from .equity import estimate_equity, relative_strength
+from .preflop import (
+    OPENING_RANGES, PREMIUM_PERCENTILE, STRONG_PERCENTILE,
+    preflop_percentile, position_class
+)
 
-
-def get_db_models():
-    from models import db, PokerGame, PokerPlayer, PokerHand, PokerAction, PokerConfig, User
-    return db, PokerGame, PokerPlayer, PokerHand, PokerAction, PokerConfig, User
+logger = logging.getLogger(__name__)
 
 
 class RuleBasedAI:
     """基于规则和牌力评估的AI"""
 
-    # 翻牌前起手牌分级 (Chen公式简化版)
-    PREMIUM_HANDS = {'AA', 'KK', 'QQ', 'AKs', 'AKo'}  # 顶级牌
-    STRONG_HANDS = {'JJ', 'TT', 'AQs', 'AQo', 'AJs', 'KQs', '99'}  # 强牌
-    PLAYABLE_HANDS = {'88', '77', '66', 'ATs', 'AJo', 'KJs', 'KQo', 'QJs', 'JTs', 'KTs', 'QTs', 'A9s', 'A8s', 'A7s', 'A6s', 'A5s', 'A4s', 'A3s', 'A2s'}  # 可玩牌
-
     def __init__(self, difficulty: str = 'medium'):
         self.difficulty = difficulty
         # 难度影响: easy更被动, hard更激进且会诈唬
@@ -34,64 +39,24 @@ class RuleBasedAI:
         self.bluff_frequency = {'easy': 0.1, 'medium': 0.2, 'hard': 0.3}.get(difficulty, 0.2)
         self.call_loose = {'easy': 0.4, 'medium': 0.5, 'hard': 0.3}.get(difficulty, 0.5)  # 跟注宽松度
 
-    def _get_preflop_strength(self, hand: List[str]) -> int:
-        """翻牌前手牌强度: 0=弱, 1=可玩, 2=强, 3=顶级"""
+    @property
+    def opening_range(self) -> Dict[str, float]:
+        """各位置的入池范围"""
+        return OPENING_RANGES.get(self.difficulty, OPENING_RANGES['medium'])
+
+    def _get_preflop_strength(self, game: TexasHoldEm, player_id: int) -> int:
+        """翻牌前手牌强度: 0=弱, 1=可玩, 2=强, 3=顶级（查 169 类起手牌表）"""
+        hand = game.get_hand(player_id)
         if len(hand) < 2:
             return 0
 
-        # 解析牌面，处理可能的不同格式
-        card1, card2 = str(hand[0]), str(hand[1])
-
-        # 提取rank和suit
-        r1 = card1[0] if len(card1) >= 2 else card1
-        s1 = card1[-1] if len(card1) >= 2 else ''
-        r2 = card2[0] if len(card2) >= 2 else card2
-        s2 = card2[-1] if len(card2) >= 2 else ''
-
-        is_suited = s1 == s2
-        is_pair = r1 == r2
-
-        # 标准化表示 - 大的在前
-        ranks = 'AKQJT98765432'
-        r1_idx = ranks.find(r1) if r1 in ranks else 99
-        r2_idx = ranks.find(r2) if r2 in ranks else 99
-        if r1_idx > r2_idx:
-            r1, r2 = r2, r1
-
-        if is_pair:
-            hand_str = f"{r1}{r2}"
-        else:
-            hand_str = f"{r1}{r2}{'s' if is_suited else 'o'}"
-
-        # 对子特殊处理
-        if is_pair:
-            if r1 in 'AK':
-                return 3  # AA, KK
-            if r1 in 'QJT':
-                return 2  # QQ, JJ, TT
-            if r1 in '9876':
-                return 1  # 中对
-            return 1  # 小对子也算可玩
-
-        if hand_str in self.PREMIUM_HANDS:
+        percentile = preflop_percentile(hand[0], hand[1])
+        if percentile <= PREMIUM_PERCENTILE:
             return 3
-        if hand_str in self.STRONG_HANDS:
+        if percentile <= STRONG_PERCENTILE:
             return 2
-        if hand_str in self.PLAYABLE_HANDS:
-            return 1
-
-        # 同花连张
-        if is_suited:
-            gap = abs(r1_idx - r2_idx)
-            if gap <= 2 and r1_idx < 8:  # 同花连张或隔一张
-                return 1
-            if r1 == 'A':  # 任何同花A
-                return 1
-
-        # 高张
-        if r1 in 'AK' and r2_idx < 6:
+        if percentile <= self.opening_range[position_class(game, player_id)]:
             return 1
-
         return 0
 
     def _get_postflop_strength(self, game: TexasHoldEm, player_id: int) -> float:
@@ -102,6 +67,12 @@ class RuleBasedAI:
             if not board or len(board) < 3:
                 return 0.5
 
+            # hard: 蒙特卡洛胜率（考虑听牌和对手数），换算为相对公平份额的强度
+            if self.difficulty == 'hard':
+                n_opponents = sum(1 for pid in game.in_pot_iter() if pid != player_id)
+                equity = estimate_equity(hand, board, n_opponents)
+                return relative_strength(equity, n_opponents)
+
             # 使用evaluator计算牌力百分比
             rank = evaluate(hand, board)
             percentile = get_five_card_rank_percentage(rank)
@@ -112,8 +83,6 @@ class RuleBasedAI:
     def decide_action(self, game: TexasHoldEm, player_id: int) -> tuple:
         """决定AI动作，返回 (ActionType, amount or None)"""
         moves = game.get_available_moves()
-        hand = game.get_hand(player_id)
-        hand_str = [str(c) for c in hand]
 
         can_fold = ActionType.FOLD in moves
         can_check = ActionType.CHECK in moves
@@ -130,7 +99,7 @@ class RuleBasedAI:
 
         # 翻牌前策略
         if phase == HandPhase.PREFLOP:
-            strength = self._get_preflop_strength(hand_str)
+            strength = self._get_preflop_strength(game, player_id)
 
             if strength == 3:  # 顶级牌 - 积极加注
                 if can_raise and moves.raise_range:
@@ -246,6 +215,18 @@ class RuleBasedAI:
         return list(moves.action_types)[0], None
 
 
+def _with_game_lock(method):
+    """同一对局的读写串行执行（加载 -> 修改 -> 保存），不同对局互不阻塞
+
+    进程内的线程由对局锁串行，共享存储（sqlite/redis）再由存储的跨进程对局锁串行。
+    """
+    @functools.wraps(method)
+    def wrapper(self, game_id, *args, **kwargs):
+        with self._game_lock(game_id), self.store.lock(game_id):
+            return method(self, game_id, *args, **kwargs)
+    return wrapper
+
+
 class PokerManager:
     """德扑游戏管理器 - 8人桌"""
 
@@ -275,33 +256,128 @@ class PokerManager:
         HandPhase.SETTLE: '结算',
     }
 
-    def __init__(self):
-        self.games: Dict[int, Dict] = {}
+    AI_ACTION_DELAY_MS = 600   # 连续AI动作的建议动画间隔
+    AI_STREET_DELAY_MS = 1000  # 发新公共牌后的建议动画间隔
+    MAX_AI_ACTIONS = 200       # 单次请求最多执行的AI动作数
+
+    def __init__(self, store=None, persistence=None):
+        # 对局状态存储: {game_id: 对局记录}，默认进程内存
+        self.store = store or MemoryGameStore()
+        # 数据库持久化，NullPersistence 可脱离 Flask 运行
+        self.persistence = persistence or DatabasePersistence()
+        # 二进制手牌历史日志（init_app 中启用）
+        self.hand_log = None
+        # 每局一把锁，没有请求持有时自动回收
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+        self.store.game_lock = self._game_lock  # 内存存储只淘汰未被持有锁的对局
+        # 状态变化监听器 listener(game_id, event, payload, user_id)，user_id 为空表示广播
+        self.listeners = []
+        self._outbox: Dict[int, List[tuple]] = {}
+
+    def init_app(self, app):
+        """按配置选择对局状态存储后端"""
+        backend = app.config.get('POKER_STATE_BACKEND', 'memory')
+        path = app.config.get('POKER_STATE_PATH') or os.path.join(app.instance_path, 'poker_state.db')
+        self.store = create_game_store(
+            backend, path=path, url=app.config.get('POKER_STATE_URL'),
+            max_games=app.config.get('POKER_MAX_LIVE_GAMES'),
+            idle_ttl=app.config.get('POKER_IDLE_TTL'),
+            finished_ttl=app.config.get('POKER_FINISHED_TTL'),
+            expire_ttl=app.config.get('POKER_STATE_EXPIRE'),
+        )
+        self.store.game_lock = self._game_lock
+        self.hand_log = HandLog(app.config.get('POKER_HISTORY_DIR') or os.path.join(app.instance_path, 'poker_history'))
+
+    def _game_lock(self, game_id: int) -> threading.RLock:
+        with self._locks_guard:
+            lock = self._locks.get(game_id)
+            if lock is None:
+                lock = self._locks[game_id] = threading.RLock()
+            return lock
+
+    def metrics(self) -> Dict:
+        """对局存储指标: 活动对局数、内存估算、淘汰/加载次数"""
+        return self.store.stats()
+
+    def add_listener(self, listener):
+        """注册状态变化监听器（如 Socket.IO 推送）"""
+        self.listeners.append(listener)
+
+    def _notify(self, game_id: int, g: Dict, event: str):
+        """记录一次状态变化，保存对局后统一发送"""
+        if not self.listeners:
+            return
+        outbox = self._outbox.setdefault(game_id, [])
+        outbox.append((event, self._build_delta(game_id, g, event), None))
+
+        if event == 'new_hand':
+            # 底牌只发给座位所属的真人玩家
+            th = g['th_game']
+            for seat in self._get_seats(game_id, g):
+                if seat.user_id:
+                    outbox.append(('hole_cards', {
+                        'game_id': game_id,
+                        'hand_number': g['hand_number'],
+                        'position': seat.position,
+                        'hand': ' '.join(str(c) for c in th.get_hand(seat.position)),
+                    }, seat.user_id))
+
+    def _save(self, game_id: int, g: Dict):
+        """保存对局记录并发送期间积累的状态变化（保存失败时丢弃，不会在下一次保存时补发）"""
+        outbox = self._outbox.pop(game_id, [])
+        self.store.put(game_id, g)
+        for event, payload, user_id in outbox:
+            for listener in self.listeners:
+                try:
+                    listener(game_id, event, payload, user_id)
+                except Exception as e:
+                    logger.warning(f'Poker listener failed for game {game_id}: {e}')
+
+    def _build_delta(self, game_id: int, g: Dict, event: str) -> Dict:
+        """构建广播用的增量状态（不含任何玩家的底牌）"""
+        th = g['th_game']
+        self._track_round(g)
+        delta = {
+            'game_id': game_id,
+            'event': event,
+            'hand_number': g['hand_number'],
+            'last_action': g['last_action'],
+            'pot': sum(pot.amount for pot in th.pots) if th.pots else 0,
+            'current_player': th.current_player if th.is_hand_running() else -1,
+            'round': self.PHASE_NAMES.get(th.hand_phase, '未知'),
+            'public_cards': ' '.join(str(c) for c in th.board) if th.board else '',
+            'is_hand_over': g['is_hand_over'],
+            'is_game_over': g['is_game_over'],
+            'pending_ai_action': g['pending_ai_action'],
+            'players': [],
+        }
+        for seat in self._get_seats(game_id, g):
+            chips, current_bet, is_active = self._seat_status(g, seat.position)
+            delta['players'].append({
+                'position': seat.position,
+                'chips': chips,
+                'current_bet': current_bet,
+                'is_active': is_active,
+            })
+        if g['is_hand_over']:
+            delta['winner_info'] = g['winner_info']
+        return delta
 
-    def create_game(self, user_id: int, ai_difficulty: str = 'medium',
+    def create_game(self, user_id: Optional[int], ai_difficulty: str = 'medium',
                    small_blind: int = 10, big_blind: int = 20,
                    buy_in: int = 1000, ai_player_count: int = 6,
                    second_user_id: int = None) -> int:
-        """创建德扑游戏 - 支持1-2个真人玩家"""
-        db, PokerGame, PokerPlayer, PokerHand, PokerAction, PokerConfig, User = get_db_models()
-
+        """创建德扑游戏 - 支持0-2个真人玩家（0 个真人即全AI对局，用于模拟）"""
         # 计算玩家数量：真人 + AI
-        human_count = 2 if second_user_id else 1
+        user_ids = [uid for uid in (user_id, second_user_id) if uid]
+        human_count = len(user_ids)
         total_players = min(human_count + ai_player_count, 8)
 
-        # 创建数据库记录
-        game = PokerGame(
-            game_type='cash_game',
-            small_blind=small_blind,
-            big_blind=big_blind,
-            buy_in=buy_in,
-            max_players=total_players,
-            ai_difficulty=ai_difficulty,
-            status='playing',
-            created_by=user_id
+        # 创建数据库记录，座位表缓存在对局记录中，状态快照无需再查询数据库
+        game_id, seats = self.persistence.create_game(
+            user_ids, ai_difficulty, small_blind, big_blind, buy_in, total_players
         )
-        db.session.add(game)
-        db.session.commit()
 
         # 创建 texasholdem 游戏
         th_game = TexasHoldEm(
@@ -312,44 +388,8 @@ class PokerManager:
         )
         th_game.start_hand()
 
-        # 创建玩家记录
-        human_positions = [0]  # 第一个真人在位置0
-        if second_user_id:
-            human_positions.append(1)  # 第二个真人在位置1
-
-        for i in range(total_players):
-            if i == 0:
-                # 第一个真人玩家
-                player = PokerPlayer(
-                    game_id=game.id,
-                    user_id=user_id,
-                    position=i,
-                    chips=buy_in,
-                    is_ai=False
-                )
-            elif i == 1 and second_user_id:
-                # 第二个真人玩家
-                player = PokerPlayer(
-                    game_id=game.id,
-                    user_id=second_user_id,
-                    position=i,
-                    chips=buy_in,
-                    is_ai=False
-                )
-            else:
-                # AI玩家
-                ai_index = i - human_count + 1
-                player = PokerPlayer(
-                    game_id=game.id,
-                    user_id=None,
-                    position=i,
-                    chips=buy_in,
-                    is_ai=True,
-                    ai_name=f'AI玩家{ai_index}',
-                    ai_type=ai_difficulty
-                )
-            db.session.add(player)
-        db.session.commit()
+        # 真人依次坐在前面的位置
+        human_positions = list(range(human_count))
 
         # 创建AI代理（只为AI位置创建）
         ai_agents = {}
@@ -358,9 +398,9 @@ class PokerManager:
                 ai_agents[i] = RuleBasedAI(ai_difficulty)
 
         # 游戏状态
-        self.games[game.id] = {
+        self.store.put(game_id, {
             'th_game': th_game,
-            'game': game,
+            'seats': seats,
             'ai_agents': ai_agents,
             'human_positions': human_positions,
             'total_players': total_players,
@@ -372,41 +412,38 @@ class PokerManager:
             'pending_ai_action': th_game.current_player not in human_positions,
             'last_phase': th_game.hand_phase,
             'chips_at_round_start': [th_game.buyin] * total_players,
-        }
+            'hand_actions': self._blind_actions(th_game),
+        })
 
-        return game.id
+        return game_id
 
+    @_with_game_lock
     def get_game_state(self, game_id: int, requesting_user_id: int = None) -> Dict:
         """获取游戏状态"""
-        if game_id not in self.games:
+        g = self.store.get(game_id)
+        if g is None:
             return {'error': 'Game not found'}
 
-        g = self.games[game_id]
-        th = g['th_game']
+        last_phase = g.get('last_phase')
+        state = self._build_state(game_id, g, requesting_user_id)
+        if g.get('last_phase') != last_phase:
+            self._save(game_id, g)
+        return state
 
-        # 检查是否进入新的下注轮，如果是则重置下注追踪
-        current_phase = th.hand_phase
-        if current_phase != g.get('last_phase'):
-            g['last_phase'] = current_phase
-            # 记录新轮开始时每个玩家的筹码
-            g['chips_at_round_start'] = [p.chips for p in th.players]
+    def _build_state(self, game_id: int, g: Dict, requesting_user_id: int = None) -> Dict:
+        """根据对局记录构建状态快照"""
+        th = g['th_game']
+        self._track_round(g)
 
-        db, PokerGame, PokerPlayer, *_ = get_db_models()
-        players = PokerPlayer.query.filter_by(game_id=game_id).order_by(PokerPlayer.position).all()
+        seats = self._get_seats(game_id, g)
 
         # 找出请求用户的位置
-        requesting_user_position = None
-        if requesting_user_id:
-            for p in players:
-                if p.user_id == requesting_user_id:
-                    requesting_user_position = p.position
-                    break
+        requesting_user_position = self._find_position(seats, requesting_user_id)
 
         # 构建玩家数据
         player_data = []
-        for p in players:
+        for p in seats:
             pos = p.position
-            th_player = th.players[pos] if pos < len(th.players) else None
 
             # 手牌 - 显示给手牌结束时所有人看，或者自己的手牌
             is_my_hand = (requesting_user_position is not None and pos == requesting_user_position)
@@ -419,22 +456,11 @@ class PokerManager:
             else:
                 hand_str = '??'
 
-            # 筹码和当前轮下注
-            chips = th_player.chips if th_player else 0
-            # 当前轮下注 = 该轮开始时的筹码 - 当前筹码
-            chips_at_start = g['chips_at_round_start'][pos] if pos < len(g['chips_at_round_start']) else chips
-            current_bet = chips_at_start - chips
-            if current_bet < 0:
-                current_bet = 0
-
-            # 玩家状态
-            is_active = True
-            if th_player:
-                is_active = th_player.state not in [PlayerState.OUT, PlayerState.SKIP]
+            chips, current_bet, is_active = self._seat_status(g, pos)
 
             player_data.append({
-                'id': p.id,
-                'name': p.user.username if p.user else p.ai_name,
+                'id': p.player_id,
+                'name': p.name,
                 'position': pos,
                 'chips': chips,
                 'is_ai': p.is_ai,
@@ -498,6 +524,93 @@ class PokerManager:
             'call_amount': call_amount,
         }
 
+    @staticmethod
+    def _track_round(g: Dict):
+        """检查是否进入新的下注轮，如果是则重置下注追踪"""
+        th = g['th_game']
+        current_phase = th.hand_phase
+        if current_phase != g.get('last_phase'):
+            g['last_phase'] = current_phase
+            # 记录新轮开始时每个玩家的筹码
+            g['chips_at_round_start'] = [p.chips for p in th.players]
+
+    @staticmethod
+    def _seat_status(g: Dict, pos: int) -> tuple:
+        """座位的 (筹码, 当前轮下注, 是否仍在局中)"""
+        th = g['th_game']
+        th_player = th.players[pos] if pos < len(th.players) else None
+
+        # 筹码和当前轮下注
+        chips = th_player.chips if th_player else 0
+        # 当前轮下注 = 该轮开始时的筹码 - 当前筹码
+        chips_at_start = g['chips_at_round_start'][pos] if pos < len(g['chips_at_round_start']) else chips
+        current_bet = max(chips_at_start - chips, 0)
+
+        # 玩家状态
+        is_active = True
+        if th_player:
+            is_active = th_player.state not in [PlayerState.OUT, PlayerState.SKIP]
+        return chips, current_bet, is_active
+
+    def _get_seats(self, game_id: int, g: Dict) -> Tuple[Seat, ...]:
+        """获取座位表（旧的对局记录没有缓存时从数据库补建一次）"""
+        if 'seats' not in g:
+            g['seats'] = self.persistence.load_seats(game_id)
+        return g['seats']
+
+    @staticmethod
+    def _find_position(seats: Tuple[Seat, ...], user_id: Optional[int]) -> Optional[int]:
+        """查找用户的座位位置"""
+        if user_id:
+            for seat in seats:
+                if seat.user_id == user_id:
+                    return seat.position
+        return None
+
+    @staticmethod
+    def _blind_actions(th: TexasHoldEm) -> List[Dict]:
+        """新一手的动作缓冲区，以大小盲注开头"""
+        start_chips = th.hand_history.prehand.player_chips
+        now = datetime.utcnow()
+        return [{
+            'position': pos,
+            'action_type': action_type,
+            'amount': start_chips[pos] - th.players[pos].chips,
+            'betting_round': 'preflop',
+            'timestamp': now,
+        } for action_type, pos in (('small_blind', th.sb_loc), ('big_blind', th.bb_loc))]
+
+    @staticmethod
+    def _bet_context(th: TexasHoldEm) -> tuple:
+        """动作执行前的下注信息，用于计算该动作投入的筹码"""
+        player = th.current_player
+        phase = th.hand_phase
+        return (phase, player, th.players[player].chips, th.chips_to_call(player),
+                th.player_bet_amount(player), len(th.hand_history[phase].actions))
+
+    @staticmethod
+    def _buffer_action(g: Dict, context: tuple):
+        """把刚执行的动作写入本手缓冲区，手牌结束时与结算结果一起批量落库"""
+        th = g['th_game']
+        phase, player, chips, to_call, bet, n_actions = context
+        actions = th.hand_history[phase].actions
+        if len(actions) <= n_actions:
+            return  # 动作未生效
+
+        action = actions[-1]
+        amount = {
+            ActionType.CALL: min(to_call, chips),
+            ActionType.RAISE: (action.total or 0) - bet,
+            ActionType.ALL_IN: chips,
+        }.get(action.action_type, 0)
+        g.setdefault('hand_actions', []).append({
+            'position': player,
+            'action_type': action.action_type.name.lower(),
+            'amount': amount,
+            'betting_round': phase.name.lower(),
+            'timestamp': datetime.utcnow(),
+        })
+
     def _calculate_raise_amount(self, th_game: TexasHoldEm, action_type: int) -> Optional[int]:
         """计算加注金额"""
         moves = th_game.get_available_moves()
@@ -523,73 +636,126 @@ class PokerManager:
         # 限制在合法范围内
         return max(min_raise, min(amount, max_raise))
 
+    @_with_game_lock
     def make_action(self, game_id: int, user_id: int, action: int, amount: Optional[int] = None) -> Dict:
         """执行玩家动作"""
-        if game_id not in self.games:
+        g = self.store.get(game_id)
+        if g is None:
             return {'error': 'Game not found'}
 
-        g = self.games[game_id]
         th = g['th_game']
 
         if g['is_hand_over']:
             return {'error': 'Hand is over'}
 
         # 找出用户的位置
-        db, PokerGame, PokerPlayer, *_ = get_db_models()
-        player = PokerPlayer.query.filter_by(game_id=game_id, user_id=user_id).first()
-        if not player:
+        user_position = self._find_position(self._get_seats(game_id, g), user_id)
+        if user_position is None:
             return {'error': 'Player not found in this game'}
 
-        user_position = player.position
         if th.current_player != user_position:
             return {'error': 'Not your turn'}
 
-        return self._do_action(game_id, action, amount, requesting_user_id=user_id)
+        result = self._do_action(game_id, g, action, amount, requesting_user_id=user_id)
+        if 'error' not in result:
+            self._save(game_id, g)
+        return result
 
+    @_with_game_lock
     def execute_single_ai_action(self, game_id: int, requesting_user_id: int = None) -> Dict:
         """执行单个AI动作"""
-        if game_id not in self.games:
+        g = self.store.get(game_id)
+        if g is None:
             return {'error': 'Game not found'}
 
-        g = self.games[game_id]
         th = g['th_game']
         human_positions = g.get('human_positions', [0])
 
-        if th.current_player in human_positions or g['is_hand_over'] or not th.is_hand_running():
+        if not self._is_ai_turn(g):
             g['pending_ai_action'] = False
-            return {'success': True, 'no_action': True, 'game_state': self.get_game_state(game_id, requesting_user_id)}
+            state = self._build_state(game_id, g, requesting_user_id)
+            self._save(game_id, g)
+            return {'success': True, 'no_action': True, 'game_state': state}
+
+        action_type, amount = self._decide_ai_action(g)
+
+        result = self._do_ai_action(game_id, g, action_type, amount, requesting_user_id)
+        self._save(game_id, g)
+        return result
+
+    @_with_game_lock
+    def run_ai_turns(self, game_id: int, requesting_user_id: int = None, max_actions: Optional[int] = None) -> Dict:
+        """连续执行AI动作，直到轮到真人或本手结束
+
+        返回按顺序执行的AI动作列表，每项附带 delay_ms 等节奏信息供前端播放动画。
+        """
+        g = self.store.get(game_id)
+        if g is None:
+            return {'error': 'Game not found'}
+
+        th = g['th_game']
+        limit = min(max_actions or self.MAX_AI_ACTIONS, self.MAX_AI_ACTIONS)
+        actions = []
+
+        while len(actions) < limit and self._is_ai_turn(g):
+            phase = th.hand_phase
+            action_type, amount = self._decide_ai_action(g)
+            self._apply_ai_action(game_id, g, action_type, amount)
+            self._track_round(g)
+
+            street_changed = th.hand_phase != phase
+            position = g['last_action']['player']
+            actions.append({
+                **g['last_action'],
+                'amount': amount,
+                'round': self.PHASE_NAMES.get(phase, '未知'),
+                'chips': th.players[position].chips,
+                'pot': sum(pot.amount for pot in th.pots) if th.pots else 0,
+                'public_cards': ' '.join(str(c) for c in th.board) if th.board else '',
+                'street_changed': street_changed,
+                'delay_ms': self.AI_STREET_DELAY_MS if street_changed else self.AI_ACTION_DELAY_MS,
+            })
+
+        g['pending_ai_action'] = self._is_ai_turn(g)
+        state = self._build_state(game_id, g, requesting_user_id)
+        self._save(game_id, g)
+        return {'success': True, 'actions': actions, 'game_state': state}
+
+    @staticmethod
+    def _is_ai_turn(g: Dict) -> bool:
+        """当前是否轮到AI行动"""
+        th = g['th_game']
+        return (not g['is_hand_over'] and th.is_hand_running()
+                and th.current_player not in g.get('human_positions', [0]))
 
-        # AI决策
+    @staticmethod
+    def _decide_ai_action(g: Dict) -> tuple:
+        """为当前行动的AI座位做决策"""
+        th = g['th_game']
         ai = g['ai_agents'].get(th.current_player)
         if not ai:
             ai = RuleBasedAI('medium')
+        return ai.decide_action(th, th.current_player)
 
-        action_type, amount = ai.decide_action(th, th.current_player)
-
-        return self._do_ai_action(game_id, action_type, amount, requesting_user_id)
+    def _do_ai_action(self, game_id: int, g: Dict, action_type: ActionType, amount: Optional[int], requesting_user_id: int = None) -> Dict:
+        """执行AI动作并返回最新状态"""
+        self._apply_ai_action(game_id, g, action_type, amount)
+        return {'success': True, 'game_state': self._build_state(game_id, g, requesting_user_id)}
 
-    def _do_ai_action(self, game_id: int, action_type: ActionType, amount: Optional[int], requesting_user_id: int = None) -> Dict:
+    def _apply_ai_action(self, game_id: int, g: Dict, action_type: ActionType, amount: Optional[int]):
         """执行AI动作"""
-        g = self.games[game_id]
         th = g['th_game']
         player = th.current_player
 
         # 记录动作
-        action_name = {
-            ActionType.FOLD: '弃牌',
-            ActionType.CHECK: '过牌',
-            ActionType.CALL: '跟注',
-            ActionType.RAISE: f'加注到{amount}' if amount else '加注',
-            ActionType.ALL_IN: 'ALL IN',
-        }.get(action_type, str(action_type))
-
         g['last_action'] = {
             'player': player,
             'action': action_type.value,
-            'action_name': action_name
+            'action_name': action_label(action_type, amount)
         }
 
         # 执行动作
+        context = self._bet_context(th)
         try:
             if action_type == ActionType.RAISE and amount:
                 th.take_action(action_type, total=amount)
@@ -602,19 +768,18 @@ class PokerManager:
                 g['last_action']['action_name'] = '弃牌(动作无效)'
             except:
                 pass
+        self._buffer_action(g, context)
 
         # 检查是否结束
         if not th.is_hand_running():
-            self._finish_hand(game_id)
+            self._finish_hand(game_id, g)
         else:
             human_positions = g.get('human_positions', [0])
             g['pending_ai_action'] = (th.current_player not in human_positions)
+            self._notify(game_id, g, 'action')
 
-        return {'success': True, 'game_state': self.get_game_state(game_id, requesting_user_id)}
-
-    def _do_action(self, game_id: int, action: int, custom_amount: Optional[int] = None, requesting_user_id: int = None) -> Dict:
+    def _do_action(self, game_id: int, g: Dict, action: int, custom_amount: Optional[int] = None, requesting_user_id: int = None) -> Dict:
         """执行玩家动作"""
-        g = self.games[game_id]
         th = g['th_game']
         player = th.current_player
 
@@ -676,6 +841,7 @@ class PokerManager:
         }
 
         # 执行
+        context = self._bet_context(th)
         try:
             if action_type == ActionType.RAISE and amount:
                 th.take_action(action_type, total=amount)
@@ -683,23 +849,23 @@ class PokerManager:
                 th.take_action(action_type)
         except Exception as e:
             return {'error': f'Action failed: {str(e)}'}
+        self._buffer_action(g, context)
 
         # 检查是否结束
         if not th.is_hand_running():
-            self._finish_hand(game_id)
+            self._finish_hand(game_id, g)
         else:
             human_positions = g.get('human_positions', [0])
             g['pending_ai_action'] = (th.current_player not in human_positions)
+            self._notify(game_id, g, 'action')
 
-        return {'success': True, 'game_state': self.get_game_state(game_id, requesting_user_id)}
+        return {'success': True, 'game_state': self._build_state(game_id, g, requesting_user_id)}
 
-    def _finish_hand(self, game_id: int):
+    def _finish_hand(self, game_id: int, g: Dict):
         """结束当前手牌"""
-        g = self.games[game_id]
         th = g['th_game']
 
-        db, PokerGame, PokerPlayer, *_ = get_db_models()
-        players = PokerPlayer.query.filter_by(game_id=game_id).order_by(PokerPlayer.position).all()
+        seats = self._get_seats(game_id, g)
 
         # 获取胜者信息
         winner_info = {
@@ -721,9 +887,8 @@ class PokerManager:
                         winner_pos = winners[0]
                         winner_info['winner_position'] = winner_pos
                         winner_info['pot_won'] = amount
-                        if winner_pos < len(players):
-                            p = players[winner_pos]
-                            winner_info['winner_name'] = p.user.username if p.user else p.ai_name
+                        if winner_pos < len(seats):
+                            winner_info['winner_name'] = seats[winner_pos].name
                         break
 
         # 获取所有玩家手牌
@@ -734,40 +899,88 @@ class PokerManager:
             except:
                 winner_info['player_hands'][i] = ''
 
-        # 计算收益
+        # 计算收益（相对本手开始、盲注前的筹码）
+        start_chips = th.hand_history.prehand.player_chips if th.hand_history else {}
         for i in range(g['total_players']):
             th_player = th.players[i]
-            winner_info['payoffs'].append(th_player.chips - players[i].chips if th_player else 0)
+            winner_info['payoffs'].append(th_player.chips - start_chips.get(i, th_player.chips) if th_player else 0)
 
         g['winner_info'] = winner_info
         g['is_hand_over'] = True
         g['pending_ai_action'] = False
 
-        # 更新数据库中的筹码
-        for i, p in enumerate(players):
-            if i < len(th.players):
-                p.chips = th.players[i].chips
-                # 检查是否出局
-                if p.chips <= 0:
-                    p.is_active = False
-                    g['is_game_over'] = True
+        # 有人出局则对局结束；筹码和本手牌局记录在同一个事务中写入
+        chips = [p.chips for p in th.players]
+        if any(c <= 0 for c in chips):
+            g['is_game_over'] = True
+        actions = g.pop('hand_actions', [])
+        if self.hand_log:
+            try:
+                self.hand_log.append(game_id, encode_hand(th, g['hand_number'], actions))
+            except Exception as e:
+                logger.warning(f'Hand log write failed for game {game_id}: {e}')
+        hand = self._hand_record(g, seats, winner_info, actions)
+        self.persistence.finish_hand(game_id, chips, g['is_game_over'], hand)
+        self._notify(game_id, g, 'hand_over')
+
+    @staticmethod
+    def _hand_record(g: Dict, seats: Tuple[Seat, ...], winner_info: Dict, actions: List[Dict]) -> Dict:
+        """把本手动作缓冲区整理为 PokerHand / PokerAction 记录"""
+        th = g['th_game']
+        pot_size, hand_result = 0, None
+        if th.hand_history and th.hand_history.settle:
+            for amount, rank, winners in th.hand_history.settle.pot_winners.values():
+                pot_size += amount
+                if hand_result is None and winners:
+                    hand_result = rank_label(rank)
 
-        if g['is_game_over']:
-            g['game'].status = 'finished'
-            g['game'].finished_at = datetime.utcnow()
+        winner_pos = winner_info['winner_position']
+        return {
+            'hand_number': g['hand_number'],
+            'community_cards': winner_info['public_cards'],
+            'hole_cards': winner_info['player_hands'],
+            'pot_size': pot_size,
+            'winner_id': seats[winner_pos].player_id if 0 <= winner_pos < len(seats) else None,
+            'hand_result': hand_result or 'uncontested',
+            'actions': [{
+                'player_id': seats[a['position']].player_id,
+                'action_type': a['action_type'],
+                'amount': a['amount'],
+                'betting_round': a['betting_round'],
+                'timestamp': a['timestamp'],
+            } for a in actions if a['position'] < len(seats)],
+        }
 
-        db.session.commit()
+    def replay_hand(self, game_id: int, hand_number: int, requesting_user_id: int = None) -> Dict:
+        """从手牌历史日志重放指定手牌，steps 为逐步生成的重放事件"""
+        g = self.store.get(game_id)
+        seats = self._get_seats(game_id, g) if g is not None else self.persistence.load_seats(game_id)
+        if not seats:
+            return {'error': 'Game not found'}
+        if self._find_position(seats, requesting_user_id) is None:
+            return {'error': 'Player not found in this game'}
 
+        record = self.hand_log.read_hand(game_id, hand_number) if self.hand_log else None
+        if record is None:
+            return {'error': 'Hand not found'}
+
+        round_names = {phase.name.lower(): name for phase, name in self.PHASE_NAMES.items()}
+        return {'success': True, 'steps': replay_steps(record, [s.name for s in seats], round_names)}
+
+    @_with_game_lock
     def new_hand(self, game_id: int, requesting_user_id: int = None) -> Dict:
         """开始新的一手牌"""
-        if game_id not in self.games:
+        g = self.store.get(game_id)
+        if g is None:
             return {'error': 'Game not found'}
 
-        g = self.games[game_id]
-
         if g['is_game_over']:
             return {'error': 'Game is over'}
 
+        if not g['is_hand_over']:
+            # 其他请求已经开始了新的一手（如两个标签页同时点击），直接返回当前状态
+            return {'success': True, 'game_state': self._build_state(game_id, g, requesting_user_id)}
+
         th = g['th_game']
         human_positions = g.get('human_positions', [0])
 
@@ -781,12 +994,15 @@ class PokerManager:
         g['pending_ai_action'] = (th.current_player not in human_positions)
         g['last_phase'] = th.hand_phase
         g['chips_at_round_start'] = [p.chips for p in th.players]
+        g['hand_actions'] = self._blind_actions(th)
+
+        self.persistence.start_hand(game_id)
 
-        db, *_ = get_db_models()
-        g['game'].status = 'playing'
-        db.session.commit()
+        self._notify(game_id, g, 'new_hand')
 
-        return {'success': True, 'game_state': self.get_game_state(game_id, requesting_user_id)}
+        state = self._build_state(game_id, g, requesting_user_id)
+        self._save(game_id, g)
+        return {'success': True, 'game_state': state}
 
 
 poker_manager = PokerManager()
@@ -0,0 +1,166 @@
+"""
+德扑对局的数据库持久化 - 可替换
+
+- DatabasePersistence: 写入 Flask-SQLAlchemy 模型（默认，需要应用上下文）
+- NullPersistence: 不落库，对局编号在进程内分配，用于无 Flask 环境的模拟和基准测试
+
+PokerManager 只在创建对局、手牌结束、开始新一手时调用这里的方法。
+手牌进行中的动作先缓存在对局记录里（write-behind），手牌结束时连同筹码一次事务写入。
+"""
+
+import itertools
+import json
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+def get_db_models():
+    from models import db, PokerGame, PokerPlayer, PokerHand, PokerAction, PokerConfig, User
+    return db, PokerGame, PokerPlayer, PokerHand, PokerAction, PokerConfig, User
+
+
+class Seat(NamedTuple):
+    """座位信息 - 创建对局时确定，之后不再变化"""
+    position: int
+    name: str
+    is_ai: bool
+    player_id: int
+    user_id: Optional[int]
+
+
+def ai_name(ai_index: int) -> str:
+    return f'AI玩家{ai_index}'
+
+
+class DatabasePersistence:
+    """写入 PokerGame / PokerPlayer 表"""
+
+    def create_game(self, user_ids: Sequence[int], ai_difficulty: str, small_blind: int,
+                    big_blind: int, buy_in: int, total_players: int) -> Tuple[int, Tuple[Seat, ...]]:
+        """创建对局和玩家记录，返回 (game_id, 座位表)；真人依次坐在前面的位置"""
+        db, PokerGame, PokerPlayer, PokerHand, PokerAction, PokerConfig, User = get_db_models()
+
+        game = PokerGame(
+            game_type='cash_game',
+            small_blind=small_blind,
+            big_blind=big_blind,
+            buy_in=buy_in,
+            max_players=total_players,
+            ai_difficulty=ai_difficulty,
+            status='playing',
+            created_by=user_ids[0]
+        )
+        db.session.add(game)
+        db.session.commit()
+
+        players = []
+        for i in range(total_players):
+            if i < len(user_ids):
+                # 真人玩家
+                player = PokerPlayer(
+                    game_id=game.id,
+                    user_id=user_ids[i],
+                    position=i,
+                    chips=buy_in,
+                    is_ai=False
+                )
+            else:
+                # AI玩家
+                player = PokerPlayer(
+                    game_id=game.id,
+                    user_id=None,
+                    position=i,
+                    chips=buy_in,
+                    is_ai=True,
+                    ai_name=ai_name(i - len(user_ids) + 1),
+                    ai_type=ai_difficulty
+                )
+            db.session.add(player)
+            players.append(player)
+        db.session.commit()
+
+        usernames = {u.id: u.username for u in User.query.filter(User.id.in_(list(user_ids))).all()}
+        seats = tuple(
+            Seat(
+                position=p.position,
+                name=usernames.get(p.user_id, '') if p.user_id else p.ai_name,
+                is_ai=p.is_ai,
+                player_id=p.id,
+                user_id=p.user_id
+            ) for p in players
+        )
+        return game.id, seats
+
+    def load_seats(self, game_id: int) -> Tuple[Seat, ...]:
+        """从玩家表重建座位表（旧的对局记录没有缓存座位时使用）"""
+        db, PokerGame, PokerPlayer, *_ = get_db_models()
+        players = PokerPlayer.query.filter_by(game_id=game_id).order_by(PokerPlayer.position).all()
+        return tuple(
+            Seat(p.position, p.user.username if p.user else p.ai_name, p.is_ai, p.id, p.user_id)
+            for p in players
+        )
+
+    def finish_hand(self, game_id: int, chips: List[int], is_game_over: bool, hand: Optional[Dict] = None):
+        """手牌结束时同步筹码、写入本手牌局记录（PokerHand + 批量 PokerAction），有人出局则结束对局"""
+        db, PokerGame, PokerPlayer, PokerHand, PokerAction, *_ = get_db_models()
+        players = PokerPlayer.query.filter_by(game_id=game_id).order_by(PokerPlayer.position).all()
+        for i, p in enumerate(players):
+            if i < len(chips):
+                p.chips = chips[i]
+                if p.chips <= 0:
+                    p.is_active = False
+
+        if is_game_over:
+            game = PokerGame.query.get(game_id)
+            game.status = 'finished'
+            game.finished_at = datetime.utcnow()
+
+        if hand:
+            record = PokerHand(
+                game_id=game_id,
+                hand_number=hand['hand_number'],
+                community_cards=json.dumps(hand['community_cards']),
+                hole_cards=json.dumps(hand['hole_cards']),
+                pot_size=hand['pot_size'],
+                winner_id=hand['winner_id'],
+                hand_result=hand['hand_result']
+            )
+            db.session.add(record)
+            db.session.flush()
+            if hand['actions']:
+                db.session.execute(db.insert(PokerAction), [
+                    {'hand_id': record.id, **action} for action in hand['actions']
+                ])
+
+        db.session.commit()
+
+    def start_hand(self, game_id: int):
+        db, PokerGame, *_ = get_db_models()
+        PokerGame.query.get(game_id).status = 'playing'
+        db.session.commit()
+
+
+class NullPersistence:
+    """不落库 - 无需 Flask 应用和数据库"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def create_game(self, user_ids: Sequence[int], ai_difficulty: str, small_blind: int,
+                    big_blind: int, buy_in: int, total_players: int) -> Tuple[int, Tuple[Seat, ...]]:
+        game_id = next(self._ids)
+        seats = tuple(
+            Seat(i, f'玩家{user_ids[i]}', False, i, user_ids[i]) if i < len(user_ids)
+            else Seat(i, ai_name(i - len(user_ids) + 1), True, i, None)
+            for i in range(total_players)
+        )
+        return game_id, seats
+
+    def load_seats(self, game_id: int) -> Tuple[Seat, ...]:
+        return ()
+
+    def finish_hand(self, game_id: int, chips: List[int], is_game_over: bool, hand: Optional[Dict] = None):
+        pass
+
+    def start_hand(self, game_id: int):
+        pass
@@ -0,0 +1,104 @@
+"""
+翻牌前 169 类起手牌查表
+
+PREFLOP_EQUITY[i][j] 为起手牌对三手随机牌的胜率（%，四人底池，离线蒙特卡洛 12000 次/类），
+按 texasholdem.Card.rank（0=2 ... 12=A）索引:
+- i == j: 对子
+- i > j: 同花（大牌在前）
+- i < j: 非同花（小牌在前）
+
+PREFLOP_PERCENTILE 按胜率排序后的累计组合占比（0-1，越小越强），由上表在导入时计算。
+"""
+
+from typing import Dict, Tuple
+from texasholdem.card import Card
+
+PREFLOP_EQUITY: Tuple[Tuple[float, ...], ...] = (
+    #    2     3     4     5     6     7     8     9     T     J     Q     K     A
+    (21.3, 13.7, 14.9, 15.6, 15.5, 14.8, 15.7, 16.7, 17.1, 19.0, 20.0, 21.7, 25.9),  # 2
+    (18.5, 23.9, 16.3, 17.4, 16.5, 15.8, 15.9, 16.4, 18.2, 19.1, 20.7, 22.8, 26.1),  # 3
+    (19.6, 21.4, 25.9, 19.0, 18.6, 17.8, 17.9, 17.8, 18.7, 19.9, 21.7, 23.6, 27.6),  # 4
+    (20.1, 21.5, 22.9, 28.2, 20.5, 20.8, 19.4, 19.5, 19.8, 20.9, 22.4, 24.8, 28.6),  # 5
+    (19.1, 20.8, 22.4, 24.2, 31.0, 21.4, 20.6, 21.4, 21.4, 22.0, 23.0, 26.4, 27.8),  # 6
+    (19.0, 20.5, 22.0, 23.9, 24.8, 34.8, 23.1, 23.5, 23.3, 23.7, 24.1, 26.3, 28.3),  # 7
+    (19.1, 20.4, 21.8, 23.4, 25.4, 27.2, 37.7, 24.9, 25.6, 25.5, 26.6, 26.4, 30.1),  # 8
+    (20.4, 21.3, 21.9, 22.9, 24.9, 26.2, 28.0, 40.5, 28.2, 28.4, 28.1, 29.8, 31.8),  # 9
+    (21.9, 23.0, 22.5, 23.5, 25.5, 27.4, 28.7, 31.6, 45.4, 31.9, 31.4, 31.4, 34.7),  # T
+    (22.7, 23.5, 23.5, 24.6, 25.1, 27.9, 28.9, 31.1, 34.7, 49.4, 32.2, 33.7, 35.8),  # J
+    (24.6, 24.8, 25.6, 26.4, 27.3, 27.6, 29.5, 32.3, 35.3, 35.3, 53.9, 35.6, 36.6),  # Q
+    (26.4, 26.9, 28.2, 28.3, 29.6, 28.8, 30.4, 33.0, 35.2, 37.2, 37.9, 58.9, 38.3),  # K
+    (28.8, 30.2, 31.1, 31.7, 31.6, 32.3, 33.7, 34.9, 36.8, 39.0, 39.2, 42.4, 64.1),  # A
+)
+
+TOTAL_COMBOS = 1326
+
+# 牌力分级阈值（累计组合占比）
+PREMIUM_PERCENTILE = 0.03  # TT+, AKs
+STRONG_PERCENTILE = 0.06   # 99-88, AKo, AQs-ATs, KQs, KJs
+
+# 各难度按位置的入池范围（累计组合占比）: easy 松散被动，hard 前位紧、后位宽
+OPENING_RANGES: Dict[str, Dict[str, float]] = {
+    'easy': {'early': 0.30, 'middle': 0.35, 'late': 0.40, 'blinds': 0.45},
+    'medium': {'early': 0.15, 'middle': 0.22, 'late': 0.32, 'blinds': 0.38},
+    'hard': {'early': 0.12, 'middle': 0.18, 'late': 0.40, 'blinds': 0.30},
+}
+
+
+def _build_percentiles() -> Tuple[Tuple[float, ...], ...]:
+    """按胜率从高到低累计组合数（对子6、同花4、非同花12）"""
+    classes = []
+    for i in range(13):
+        for j in range(13):
+            combos = 6 if i == j else (4 if i > j else 12)
+            classes.append((PREFLOP_EQUITY[i][j], combos, i, j))
+    classes.sort(reverse=True)
+
+    table = [[0.0] * 13 for _ in range(13)]
+    cumulative = 0
+    for _, combos, i, j in classes:
+        cumulative += combos
+        table[i][j] = cumulative / TOTAL_COMBOS
+    return tuple(tuple(row) for row in table)
+
+
+PREFLOP_PERCENTILE = _build_percentiles()
+
+
+def hand_index(card1: Card, card2: Card) -> Tuple[int, int]:
+    """起手牌在 13x13 表中的下标"""
+    r1, r2 = card1.rank, card2.rank
+    if r1 < r2:
+        r1, r2 = r2, r1
+    if card1.suit == card2.suit:
+        return r1, r2
+    return r2, r1
+
+
+def preflop_equity(card1: Card, card2: Card) -> float:
+    """对三手随机牌的胜率（%）"""
+    i, j = hand_index(card1, card2)
+    return PREFLOP_EQUITY[i][j]
+
+
+def preflop_percentile(card1: Card, card2: Card) -> float:
+    """起手牌强度排名（累计组合占比，越小越强）"""
+    i, j = hand_index(card1, card2)
+    return PREFLOP_PERCENTILE[i][j]
+
+
+def position_class(game, player_id: int) -> str:
+    """翻牌前位置: early / middle / late / blinds"""
+    if player_id in (game.sb_loc, game.bb_loc):
+        return 'blinds'
+
+    # 翻牌前行动顺序: 大盲下家 ... 按钮
+    order = [p for p in game.in_pot_iter(game.bb_loc + 1) if p not in (game.sb_loc, game.bb_loc)]
+    if player_id not in order:
+        return 'middle'
+    idx = order.index(player_id)
+    from_button = len(order) - 1 - idx
+    if from_button <= 1:
+        return 'late'
+    if idx < len(order) // 3:
+        return 'early'
+    return 'middle'
@@ -1,49 +1,213 @@
 """Asset management routes."""
 from flask import Blueprint, request, session, jsonify, current_app
 from datetime import datetime, timedelta
-from models import db, Asset, AssetHistory, AssetCategoryHistory
-from app.utils import require_auth, validate_category, get_asset_categories, get_category_colors
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import (
+    db, Asset, AssetHistory, AssetCategoryHistory, AssetHistoryRollup, AssetCategoryHistoryRollup
+)
+from app.utils import (
+    require_auth, validate_category, get_asset_categories, get_category_colors,
+    DEFAULT_MAX_POINTS, downsample_indices
+)
 
 bp = Blueprint('assets', __name__)
 
 
-def update_asset_history():
-    """Update asset history records (including total and category history)."""
-    # Calculate current total assets
-    total_assets = db.session.query(db.func.sum(Asset.amount)).scalar() or 0
-    today = datetime.now().date()
-
-    # Update total asset history
-    today_record = AssetHistory.query.filter_by(date=today).first()
-    if today_record:
-        today_record.total_assets = total_assets
-    else:
-        history = AssetHistory(date=today, total_assets=total_assets)
-        db.session.add(history)
+ROLLUP_PERIODS = ('week', 'month')
+ROLLUP_FIELDS = ('first_date', 'first_value', 'min_date', 'min_value', 'max_date', 'max_value', 'last_date')
+
+
+def _period_start(period, day):
+    """First day of the week (Monday) or month containing day."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _next_period_start(period, start):
+    """First day of the week/month after the one starting at start."""
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def _summarize_period(points, close_field):
+    """Rollup columns for a period's (date, value) points in date order: first, min, max and last (the close)."""
+    low = min(points, key=lambda point: point[1] or 0)
+    high = max(points, key=lambda point: point[1] or 0)
+    return {
+        'first_date': points[0][0], 'first_value': points[0][1],
+        'min_date': low[0], 'min_value': low[1],
+        'max_date': high[0], 'max_value': high[1],
+        'last_date': points[-1][0], close_field: points[-1][1],
+    }
+
+
+def _refresh_rollups(day, categories=(), total=False):
+    """Recompute the week/month rollups containing day from that period's daily rows.
+
+    A period holds at most 31 daily rows, and a day's value can go down as well as up,
+    so the period is summarized again rather than patched.
+    """
+    for period in ROLLUP_PERIODS:
+        start = _period_start(period, day)
+        end = _next_period_start(period, start)
+        if total:
+            points = db.session.query(AssetHistory.date, AssetHistory.total_assets).filter(
+                AssetHistory.date >= start,
+                AssetHistory.date < end
+            ).order_by(AssetHistory.date.asc()).all()
+            if points:
+                stmt = sqlite_insert(AssetHistoryRollup).values(
+                    period=period, period_start=start, **_summarize_period(points, 'total_assets')
+                )
+                db.session.execute(stmt.on_conflict_do_update(
+                    index_elements=['period', 'period_start'],
+                    set_={field: stmt.excluded[field] for field in ROLLUP_FIELDS + ('total_assets',)}
+                ))
+        for category in categories:
+            points = db.session.query(AssetCategoryHistory.date, AssetCategoryHistory.amount).filter(
+                AssetCategoryHistory.category == category,
+                AssetCategoryHistory.date >= start,
+                AssetCategoryHistory.date < end
+            ).order_by(AssetCategoryHistory.date.asc()).all()
+            if points:
+                stmt = sqlite_insert(AssetCategoryHistoryRollup).values(
+                    period=period, period_start=start, category=category, **_summarize_period(points, 'amount')
+                )
+                db.session.execute(stmt.on_conflict_do_update(
+                    index_elements=['period', 'period_start', 'category'],
+                    set_={field: stmt.excluded[field] for field in ROLLUP_FIELDS + ('amount',)}
+                ))
+
+
+def rebuild_asset_rollups():
+    """Rebuild the week/month rollup tables from the daily history (one pass over each table)."""
+    AssetHistoryRollup.query.delete()
+    AssetCategoryHistoryRollup.query.delete()
+
+    totals = {}
+    for day, total in db.session.query(
+        AssetHistory.date, AssetHistory.total_assets
+    ).order_by(AssetHistory.date.asc()):
+        for period in ROLLUP_PERIODS:
+            totals.setdefault((period, _period_start(period, day)), []).append((day, total))
+
+    categories = {}
+    for day, category, amount in db.session.query(
+        AssetCategoryHistory.date, AssetCategoryHistory.category, AssetCategoryHistory.amount
+    ).order_by(AssetCategoryHistory.date.asc()):
+        for period in ROLLUP_PERIODS:
+            categories.setdefault((period, _period_start(period, day), category), []).append((day, amount))
+
+    if totals:
+        db.session.execute(db.insert(AssetHistoryRollup), [
+            {'period': period, 'period_start': start, **_summarize_period(points, 'total_assets')}
+            for (period, start), points in totals.items()
+        ])
+    if categories:
+        db.session.execute(db.insert(AssetCategoryHistoryRollup), [
+            {'period': period, 'period_start': start, 'category': category,
+             **_summarize_period(points, 'amount')}
+            for (period, start, category), points in categories.items()
+        ])
+    db.session.commit()
+    return len(totals), len(categories)
 
-    # Update category asset history
-    category_totals = db.session.query(
-        Asset.category,
-        db.func.sum(Asset.amount).label('total')
-    ).group_by(Asset.category).all()
 
-    for category, total in category_totals:
-        today_category_record = AssetCategoryHistory.query.filter_by(
-            date=today,
-            category=category
-        ).first()
+def _upsert_history(category_changes, total_change):
+    """Add deltas to today's AssetHistory / AssetCategoryHistory rows.
 
-        if today_category_record:
-            today_category_record.amount = total
-        else:
-            category_history = AssetCategoryHistory(
-                date=today,
-                category=category,
-                amount=total
-            )
-            db.session.add(category_history)
+    Today's row is created on first write from the latest earlier value plus the delta
+    (INSERT ... ON CONFLICT DO UPDATE), so the cost does not depend on the number of assets.
+    The week/month rollups containing today are refreshed in the same statements' transaction.
+    Does not commit: callers commit together with the asset change.
+    """
+    today = datetime.now().date()
 
-    db.session.commit()
+    if total_change:
+        previous_total = select(AssetHistory.total_assets).where(
+            AssetHistory.date < today
+        ).order_by(AssetHistory.date.desc()).limit(1).scalar_subquery()
+        stmt = sqlite_insert(AssetHistory).values(
+            date=today,
+            total_assets=db.func.coalesce(previous_total, 0) + total_change
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['date'],
+            set_={'total_assets': AssetHistory.total_assets + total_change}
+        ))
+        _refresh_rollups(today, total=True)
+
+    for category, change in category_changes.items():
+        if not change:
+            continue
+        previous_amount = select(AssetCategoryHistory.amount).where(
+            AssetCategoryHistory.category == category,
+            AssetCategoryHistory.date < today
+        ).order_by(AssetCategoryHistory.date.desc()).limit(1).scalar_subquery()
+        stmt = sqlite_insert(AssetCategoryHistory).values(
+            date=today,
+            category=category,
+            amount=db.func.coalesce(previous_amount, 0) + change
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['date', 'category'],
+            set_={'amount': AssetCategoryHistory.amount + change}
+        ))
+        _refresh_rollups(today, categories=[category])
+
+
+def record_asset_change(changes):
+    """Apply per-category amount changes ({category: delta}) of one asset write to today's history."""
+    changes = {category: change for category, change in changes.items() if change}
+    if changes:
+        _upsert_history(changes, sum(changes.values()))
+
+
+def _latest_category_amounts(before=None):
+    """{category: amount} from each category's latest history row (only rows dated before `before` if given)."""
+    latest_dates = db.session.query(
+        AssetCategoryHistory.category,
+        db.func.max(AssetCategoryHistory.date).label('date')
+    )
+    if before is not None:
+        latest_dates = latest_dates.filter(AssetCategoryHistory.date < before)
+    latest_dates = latest_dates.group_by(AssetCategoryHistory.category).subquery()
+    return dict(db.session.query(AssetCategoryHistory.category, AssetCategoryHistory.amount).join(
+        latest_dates,
+        db.and_(AssetCategoryHistory.category == latest_dates.c.category,
+                AssetCategoryHistory.date == latest_dates.c.date)
+    ).all())
+
+
+def reconcile_asset_history():
+    """Full recompute against the Asset table; writes today's rows only where the latest history differs.
+
+    Run once at startup so assets changed outside these routes (or by older versions) do not leave
+    the incremental totals drifting.
+    """
+    actual = dict(db.session.query(
+        Asset.category, db.func.sum(Asset.amount)
+    ).group_by(Asset.category).all())
+    actual_total = sum(actual.values())
+
+    recorded = _latest_category_amounts()
+    latest_total = AssetHistory.query.order_by(AssetHistory.date.desc()).first()
+    recorded_total = latest_total.total_assets if latest_total else 0
+
+    changes = {}
+    for category in set(actual) | set(recorded):
+        change = (actual.get(category) or 0) - (recorded.get(category) or 0)
+        if abs(change) > 0.005:
+            changes[category] = change
+    total_change = actual_total - recorded_total if abs(actual_total - recorded_total) > 0.005 else 0
+
+    if changes or total_change:
+        _upsert_history(changes, total_change)
+        db.session.commit()
+    return changes, total_change
 
 
 @bp.route('/api/assets', methods=['GET'])
@@ -95,8 +259,8 @@ def create_asset():
         user_id=session['user_id']
     )
     db.session.add(asset)
+    record_asset_change({category: amount})
     db.session.commit()
-    update_asset_history()
     return jsonify({'success': True, 'id': asset.id})
 
 
@@ -109,6 +273,8 @@ def update_asset(asset_id):
     if not data:
         return jsonify({'success': False, 'error': '无效请求'}), 400
 
+    old_category, old_amount = asset.category, asset.amount
+
     if 'name' in data:
         name = data.get('name', '').strip()
         if not name or len(name) > 100:
@@ -128,8 +294,10 @@ def update_asset(asset_id):
             return jsonify({'success': False, 'error': '金额必须是数字'}), 400
 
     asset.updated_at = datetime.utcnow()
+    changes = {old_category: -old_amount}
+    changes[asset.category] = changes.get(asset.category, 0) + asset.amount
+    record_asset_change(changes)
     db.session.commit()
-    update_asset_history()
     return jsonify({'success': True})
 
 
@@ -139,8 +307,8 @@ def delete_asset(asset_id):
     """Delete an asset."""
     asset = Asset.query.get_or_404(asset_id)
     db.session.delete(asset)
+    record_asset_change({asset.category: -asset.amount})
     db.session.commit()
-    update_asset_history()
     return jsonify({'success': True})
 
 
@@ -150,6 +318,111 @@ def get_categories():
     return jsonify({'success': True, 'categories': get_asset_categories()})
 
 
+def _chart_granularity(start_date, end_date):
+    """Coarsest granularity that still draws the range with enough points."""
+    days = (end_date - start_date).days
+    if days <= 180:
+        return 'day'
+    if days <= 730:
+        return 'week'
+    return 'month'
+
+
+def _date_label(day, granularity, range_days):
+    if granularity != 'day':
+        # Week/month points sit on the actual days of each period's first/min/max/last value
+        return day.strftime('%Y-%m-%d')
+    return day.strftime('%m-%d') if range_days <= 365 else day.strftime('%Y-%m')
+
+
+def _rollup_points(row, close):
+    """A rollup row as its distinct (date, value) points - first, min, max, last - in date order."""
+    return sorted({
+        row.first_date: row.first_value,
+        row.min_date: row.min_value,
+        row.max_date: row.max_value,
+        row.last_date: close,
+    }.items())
+
+
+def _whole_periods(start_date, end_date, granularity):
+    """[start, stop) of the whole week/month periods inside the range (start >= stop when there are none)."""
+    start = _period_start(granularity, start_date)
+    if start < start_date:
+        start = _next_period_start(granularity, start)
+    return start, _period_start(granularity, end_date + timedelta(days=1))
+
+
+def _daily_totals(start_date, end_date):
+    return db.session.query(AssetHistory.date, AssetHistory.total_assets).filter(
+        AssetHistory.date >= start_date,
+        AssetHistory.date <= end_date
+    ).order_by(AssetHistory.date.asc()).all()
+
+
+def _daily_categories(start_date, end_date):
+    return db.session.query(
+        AssetCategoryHistory.date,
+        AssetCategoryHistory.category,
+        AssetCategoryHistory.amount
+    ).filter(
+        AssetCategoryHistory.date >= start_date,
+        AssetCategoryHistory.date <= end_date
+    ).order_by(AssetCategoryHistory.date.asc()).all()
+
+
+def _total_history(start_date, end_date, granularity):
+    """(date, total) rows in the range, ordered by date.
+
+    Week/month read up to four points per whole period from the rollups, so spikes survive;
+    the partial periods at either end of the range come from the daily rows.
+    """
+    if granularity == 'day':
+        return _daily_totals(start_date, end_date)
+    start, stop = _whole_periods(start_date, end_date, granularity)
+    if start >= stop:
+        return _daily_totals(start_date, end_date)
+    history = list(_daily_totals(start_date, start - timedelta(days=1)))
+    for row in AssetHistoryRollup.query.filter(
+        AssetHistoryRollup.period == granularity,
+        AssetHistoryRollup.period_start >= start,
+        AssetHistoryRollup.period_start < stop
+    ).order_by(AssetHistoryRollup.period_start.asc()):
+        history.extend(_rollup_points(row, row.total_assets))
+    history.extend(_daily_totals(stop, end_date))
+    return history
+
+
+def _category_history(start_date, end_date, granularity):
+    """(date, category, amount) rows in the range, ordered by date (see _total_history)."""
+    if granularity == 'day':
+        return _daily_categories(start_date, end_date)
+    start, stop = _whole_periods(start_date, end_date, granularity)
+    if start >= stop:
+        return _daily_categories(start_date, end_date)
+    history = list(_daily_categories(start_date, start - timedelta(days=1)))
+    points = []
+    for row in AssetCategoryHistoryRollup.query.filter(
+        AssetCategoryHistoryRollup.period == granularity,
+        AssetCategoryHistoryRollup.period_start >= start,
+        AssetCategoryHistoryRollup.period_start < stop
+    ):
+        points.extend((day, row.category, amount) for day, amount in _rollup_points(row, row.amount))
+    history.extend(sorted(points, key=lambda point: point[0]))
+    history.extend(_daily_categories(stop, end_date))
+    return history
+
+
+def _carry_forward(amounts, dates, last=0):
+    """A category's amount on each date; dates without a row for it keep its previous amount
+    (`last` is the amount before the first date)."""
+    values = []
+    for day in dates:
+        last = amounts.get(day, last)
+        values.append(last)
+    return values
+
+
 @bp.route('/api/assets/chart-data')
 @require_auth
 def get_chart_data():
@@ -159,6 +432,7 @@ def get_chart_data():
     end_date_str = request.args.get('end_date')
     chart_type = request.args.get('type', 'total')
     pie_type = request.args.get('pie_type', 'category')
+    max_points = min(max(request.args.get('max_points', DEFAULT_MAX_POINTS, type=int), 3), 2000)
 
     try:
         if start_date_str:
@@ -173,6 +447,11 @@ def get_chart_data():
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
 
+    range_days = (end_date - start_date).days
+    granularity = request.args.get('granularity', 'auto')
+    if granularity not in ('day', 'week', 'month'):
+        granularity = _chart_granularity(start_date, end_date)
+
     # Get all assets
     assets = Asset.query.all()
 
@@ -201,66 +480,50 @@ def get_chart_data():
     if chart_type == 'category':
         category_colors = get_category_colors()
         line_data = {'labels': [], 'datasets': []}
-
-        all_dates = db.session.query(AssetCategoryHistory.date).filter(
-            AssetCategoryHistory.date >= start_date,
-            AssetCategoryHistory.date <= end_date
-        ).distinct().order_by(AssetCategoryHistory.date.asc()).all()
-
-        if all_dates:
-            dates = [d.date for d in all_dates]
-            asset_categories_list = get_asset_categories()
+        asset_categories_list = get_asset_categories()
+
+        # One range query, pivoted into {category: {date: amount}}
+        rows = _category_history(start_date, end_date, granularity)
+        # Categories only get rows on days they change: start each line from its amount before the range
+        prior = {category: amount for category, amount in _latest_category_amounts(start_date).items() if amount}
+
+        dates = [start_date] if prior else []
+        series = {}
+        for date, category, amount in rows:
+            if not dates or dates[-1] != date:
+                dates.append(date)
+            series.setdefault(category, {})[date] = amount
+
+        if dates:
+            values = {
+                category: _carry_forward(series.get(category, {}), dates, prior.get(category, 0))
+                for category in asset_categories_list if series.get(category) or category in prior
+            }
+            xs = [d.toordinal() for d in dates]
+            sampled_indices = downsample_indices(xs, list(values.values()), max_points)
+            sampled_dates = [dates[i] for i in sampled_indices]
+            line_data['labels'] = [_date_label(d, granularity, range_days) for d in sampled_dates]
 
             for category in asset_categories_list:
-                category_records = AssetCategoryHistory.query.filter(
-                    AssetCategoryHistory.category == category,
-                    AssetCategoryHistory.date >= start_date,
-                    AssetCategoryHistory.date <= end_date
-                ).order_by(AssetCategoryHistory.date.asc()).all()
-
-                if category_records and category in asset_categories_list:
-                    category_data = []
-                    for date in dates:
-                        found_record = next((r for r in category_records if r.date == date), None)
-                        category_data.append(found_record.amount if found_record else 0)
-
-                    # Smart sampling
-                    if len(category_data) > 20:
-                        sampled_indices = []
-                        total_points = len(category_data)
-                        sample_interval = total_points // 20
-                        for i in range(0, total_points, sample_interval):
-                            if i < len(category_data):
-                                sampled_indices.append(i)
-                        if sampled_indices[-1] != len(category_data) - 1:
-                            sampled_indices.append(len(category_data) - 1)
-
-                        sampled_data = [category_data[i] for i in sampled_indices]
-                        sampled_dates = [dates[i].strftime('%m-%d') for i in sampled_indices]
-                    else:
-                        sampled_data = category_data
-                        sampled_dates = [d.strftime('%m-%d') for d in dates]
-
-                    line_data['datasets'].append({
-                        'label': category,
-                        'data': sampled_data,
-                        'borderColor': category_colors.get(category, '#999'),
-                        'backgroundColor': category_colors.get(category, '#999') + '33',
-                        'borderWidth': 2,
-                        'fill': False,
-                        'tension': 0.4,
-                        'pointRadius': 3,
-                        'pointHoverRadius': 5
-                    })
-
-                    if not line_data['labels'] and sampled_dates:
-                        line_data['labels'] = sampled_dates
+                if category not in values:
+                    continue
+                line_data['datasets'].append({
+                    'label': category,
+                    'data': [values[category][i] for i in sampled_indices],
+                    'borderColor': category_colors.get(category, '#999'),
+                    'backgroundColor': category_colors.get(category, '#999') + '33',
+                    'borderWidth': 2,
+                    'fill': False,
+                    'tension': 0.4,
+                    'pointRadius': 3,
+                    'pointHoverRadius': 5
+                })
+
+            if not line_data['datasets']:
+                line_data['labels'] = []
     else:
         # Total asset line chart
-        history_records = AssetHistory.query.filter(
-            AssetHistory.date >= start_date,
-            AssetHistory.date <= end_date
-        ).order_by(AssetHistory.date.asc()).all()
+        history_records = _total_history(start_date, end_date, granularity)
 
         if not history_records:
             line_data = {
@@ -276,20 +539,14 @@ def get_chart_data():
                 }]
             }
         else:
-            sampled_history = history_records
-            daily_labels = []
-            daily_totals = []
-
-            for record in sampled_history:
-                if (end_date - start_date).days <= 31:
-                    date_label = record.date.strftime('%m-%d')
-                elif (end_date - start_date).days <= 365:
-                    date_label = record.date.strftime('%m-%d')
-                else:
-                    date_label = record.date.strftime('%Y-%m')
-
-                daily_labels.append(date_label)
-                daily_totals.append(record.total_assets)
+            sampled_indices = downsample_indices(
+                [day.toordinal() for day, _ in history_records],
+                [[total or 0 for _, total in history_records]],
+                max_points
+            )
+            sampled_history = [history_records[i] for i in sampled_indices]
+            daily_labels = [_date_label(day, granularity, range_days) for day, _ in sampled_history]
+            daily_totals = [total for _, total in sampled_history]
 
             line_data = {
                 'labels': daily_labels,
@@ -313,6 +570,7 @@ def get_chart_data():
         'pie': pie_data,
         'line': line_data,
         'chart_type': chart_type,
+        'granularity': granularity,
         'date_range': {
             'start': start_date.strftime('%Y-%m-%d'),
             'end': end_date.strftime('%Y-%m-%d')
@@ -2,14 +2,17 @@
 import os
 import uuid
 from flask import Blueprint, request, session, jsonify, current_app
-from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.utils import secure_filename
-from models import db, ChatMessage, ChatReaction
+from models import db, ChatMessage, ChatReaction, ChatCounter
 from app.utils import require_auth
+from app.sockets.chat import push_to_users
 
 bp = Blueprint('chat', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+MESSAGE_PAGE_SIZE = 100
 
 
 def allowed_file(filename):
@@ -34,27 +37,119 @@ def serialize_reactions(reactions):
     return list(reaction_map.values())
 
 
+def serialize_message(m):
+    """序列化聊天消息（含表情反应）"""
+    return {
+        'id': m.id,
+        'content': m.content,
+        'sender_id': m.sender_id,
+        'message_type': m.message_type,
+        'image_filename': m.image_filename,
+        'username': m.sender.username if m.sender else 'Unknown',
+        'created_at': m.created_at.isoformat() if m.created_at else None,
+        'reactions': serialize_reactions(m.reactions)
+    }
+
+
+REACTION_VERSION_COUNTER = 'reaction_version'
+
+
+def current_reaction_version():
+    """当前表情反应版本号（计数器尚未创建时为所有消息中最大的 reaction_version）"""
+    version = db.session.query(ChatCounter.value).filter_by(name=REACTION_VERSION_COUNTER).scalar()
+    if version is None:
+        version = db.session.query(db.func.max(ChatMessage.reaction_version)).scalar()
+    return version or 0
+
+
+def bump_reaction_version(message):
+    """表情反应变化时递增版本号，供增量同步识别
+
+    UPDATE ... SET value = value + 1 RETURNING value 在本事务内取得写锁，
+    提交前其他事务无法再递增，两次并发的变化不会拿到相同版本号。
+    计数器首次创建时从已有消息的最大 reaction_version 开始。
+    """
+    stmt = sqlite_insert(ChatCounter).values(
+        name=REACTION_VERSION_COUNTER,
+        value=db.select(db.func.coalesce(db.func.max(ChatMessage.reaction_version), 0) + 1).scalar_subquery()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'value': ChatCounter.value + 1}
+    ).returning(ChatCounter.value)
+    message.reaction_version = db.session.execute(stmt).scalar_one()
+
+
+def push_message(message):
+    """推送新消息给双方的所有在线连接"""
+    push_to_users('message', serialize_message(message),
+                  [message.sender_id, message.receiver_id])
+
+
+def push_reactions(message):
+    """推送某条消息最新的表情反应"""
+    push_to_users('reaction', {
+        'message_id': message.id,
+        'reactions': serialize_reactions(message.reactions),
+        'version': message.reaction_version
+    }, [message.sender_id, message.receiver_id])
+
+
 @bp.route('/api/chat/messages', methods=['GET'])
 @require_auth
 def get_messages():
-    """Get chat messages with reactions."""
-    messages = ChatMessage.query.options(
+    """Get chat messages with reactions.
+
+    Keyset pagination on ChatMessage.id:
+    - no cursor: the latest ``limit`` messages
+    - ``before_id``: older history, the ``limit`` messages before that id
+    - ``since_id``: delta sync, only messages newer than that id, plus
+      reactions of older messages changed after ``since_version``
+    """
+    since_id = request.args.get('since_id', type=int)
+    since_version = request.args.get('since_version', type=int)
+    before_id = request.args.get('before_id', type=int) or request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', MESSAGE_PAGE_SIZE, type=int), 1), MESSAGE_PAGE_SIZE)
+
+    query = ChatMessage.query.options(
         joinedload(ChatMessage.sender),
-        joinedload(ChatMessage.reactions).joinedload(ChatReaction.user)
-    ).order_by(ChatMessage.created_at.asc()).limit(100).all()
+        selectinload(ChatMessage.reactions).joinedload(ChatReaction.user)
+    )
+
+    if since_id is not None:
+        # 增量同步：按 id 升序取新消息
+        messages = query.filter(ChatMessage.id > since_id) \
+            .order_by(ChatMessage.id.asc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+    else:
+        if before_id is not None:
+            query = query.filter(ChatMessage.id < before_id)
+        messages = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = list(reversed(messages[:limit]))
+
+    # 旧消息的表情反应变化
+    reaction_updates = []
+    if since_id is not None and since_version is not None:
+        changed = ChatMessage.query.options(
+            selectinload(ChatMessage.reactions).joinedload(ChatReaction.user)
+        ).filter(
+            ChatMessage.id <= since_id,
+            ChatMessage.reaction_version > since_version
+        ).all()
+        reaction_updates = [{
+            'message_id': m.id,
+            'reactions': serialize_reactions(m.reactions)
+        } for m in changed]
 
     return jsonify({
         'success': True,
-        'messages': [{
-            'id': m.id,
-            'content': m.content,
-            'sender_id': m.sender_id,
-            'message_type': m.message_type,
-            'image_filename': m.image_filename,
-            'username': m.sender.username if m.sender else 'Unknown',
-            'created_at': m.created_at.isoformat() if m.created_at else None,
-            'reactions': serialize_reactions(m.reactions)
-        } for m in messages]
+        'messages': [serialize_message(m) for m in messages],
+        'reaction_updates': reaction_updates,
+        'has_more': has_more,
+        'last_id': messages[-1].id if messages else since_id,
+        'version': current_reaction_version()
     })
 
 
@@ -82,6 +177,7 @@ def send_message():
     )
     db.session.add(message)
     db.session.commit()
+    push_message(message)
     return jsonify({'success': True, 'id': message.id})
 
 
@@ -114,7 +210,9 @@ def add_reaction():
     if existing:
         # 如果已存在，则删除（切换效果）
         db.session.delete(existing)
+        bump_reaction_version(message)
         db.session.commit()
+        push_reactions(message)
         return jsonify({'success': True, 'action': 'removed'})
 
     # 添加新反应
@@ -124,7 +222,9 @@ def add_reaction():
         emoji=emoji
     )
     db.session.add(reaction)
+    bump_reaction_version(message)
     db.session.commit()
+    push_reactions(message)
     return jsonify({'success': True, 'action': 'added', 'id': reaction.id})
 
 
@@ -141,8 +241,11 @@ def remove_reaction(message_id, emoji):
     if not reaction:
         return jsonify({'success': False, 'error': '反应不存在'}), 404
 
+    message = reaction.message
     db.session.delete(reaction)
+    bump_reaction_version(message)
     db.session.commit()
+    push_reactions(message)
     return jsonify({'success': True})
 
 
@@ -185,6 +288,7 @@ def upload_image():
     )
     db.session.add(message)
     db.session.commit()
+    push_message(message)
 
     return jsonify({
         'success': True,
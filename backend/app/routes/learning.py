@@ -4,10 +4,10 @@ import json
 import re
 from datetime import datetime, date, timedelta
 
-import requests as http_requests
 from flask import Blueprint, jsonify, request, current_app
 from models import db, LearningQuestion, LearningAnswer
 from app.utils import require_auth
+from app.utils.http_client import dashscope_http
 
 bp = Blueprint('learning', __name__)
 
@@ -110,7 +110,7 @@ def generate_questions(user_id):
                 'max_tokens': 4096
             }
         }
-        resp = http_requests.post(url, headers=headers, json=data, timeout=60)
+        resp = dashscope_http.post(url, headers=headers, json=data)
         result = resp.json()
 
         if 'output' not in result or 'choices' not in result['output']:
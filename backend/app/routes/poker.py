@@ -1,5 +1,6 @@
 """Poker game routes."""
-from flask import Blueprint, request, session, jsonify
+import json
+from flask import Blueprint, Response, request, session, jsonify, stream_with_context
 from models import PokerGame, PokerConfig
 from app.games import poker_manager
 from app.utils import require_auth
@@ -85,6 +86,19 @@ def ai_step(game_id):
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
+@bp.route('/poker/game/<int:game_id>/ai_run', methods=['POST'])
+@require_auth
+def ai_run(game_id):
+    """Execute all consecutive AI actions until a human is to act or the hand ends."""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = poker_manager.run_ai_turns(game_id, requesting_user_id=session['user_id'],
+                                            max_actions=data.get('max_actions'))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+
 @bp.route('/poker/game/<int:game_id>/new_hand', methods=['POST'])
 @require_auth
 def new_hand(game_id):
@@ -96,6 +110,28 @@ def new_hand(game_id):
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
+@bp.route('/poker/game/<int:game_id>/hands/<int:hand_number>/replay')
+@require_auth
+def replay_hand(game_id, hand_number):
+    """Stream a finished hand from the hand-history log as newline-delimited JSON steps."""
+    result = poker_manager.replay_hand(game_id, hand_number, requesting_user_id=session['user_id'])
+    if 'error' in result:
+        return jsonify({'success': False, 'error': result['error']}), 404
+
+    def generate():
+        for step in result['steps']:
+            yield json.dumps(step, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@bp.route('/poker/metrics')
+@require_auth
+def metrics():
+    """Live game count and memory estimate of the poker state store."""
+    return jsonify({'success': True, 'metrics': poker_manager.metrics()})
+
+
 @bp.route('/poker/config', methods=['GET'])
 @require_auth
 def get_config():
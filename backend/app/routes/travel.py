@@ -1,14 +1,20 @@
 """Travel planning routes - 旅行计划相关路由"""
-from flask import Blueprint, request, jsonify, current_app
-import requests
+from flask import Blueprint, request, jsonify, current_app, g
 import json
+import logging
 import os
-from datetime import datetime
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-from models import db, TravelPlan, TravelItinerary
+from models import db, TravelPlan, TravelItinerary, TravelRouteJob
 from app.utils.decorators import require_auth
+from app.utils.api_cache import amap_cache
+from app.utils.http_client import amap_http
 
 bp = Blueprint('travel', __name__, url_prefix='/api/travel')
+logger = logging.getLogger(__name__)
 
 
 def get_amap_key():
@@ -55,6 +61,7 @@ def serialize_itinerary(item):
         'transport_distance': item.transport_distance,
         'transport_cost': item.transport_cost,
         'transport_info': json.loads(item.transport_info) if item.transport_info else None,
+        'route_status': item.route_status,
         # 交通类型专用字段（起终点）
         'from_location_name': item.from_location_name,
         'from_location_address': item.from_location_address,
@@ -68,10 +75,14 @@ def serialize_itinerary(item):
     }
 
 
-def calculate_route_to_item(item):
-    """计算到达某个行程项目的路线信息（同时获取驾车和公交）"""
+ROUTE_LOOKUP_WORKERS = 8  # 所有请求共享的路线查询线程数
+_route_pool = ThreadPoolExecutor(max_workers=ROUTE_LOOKUP_WORKERS, thread_name_prefix='amap-route')
+
+
+def route_endpoints(item):
+    """到达某个行程的路段起终点坐标串 (origin, destination)：同一天的前一个行程 -> 本行程；缺少坐标时返回 None"""
     if not item.latitude or not item.longitude:
-        return
+        return None
 
     # 找到同一天的前一个行程
     prev_item = TravelItinerary.query.filter(
@@ -80,94 +91,408 @@ def calculate_route_to_item(item):
         TravelItinerary.order_index < item.order_index
     ).order_by(TravelItinerary.order_index.desc()).first()
 
+    return leg_endpoints(prev_item, item)
+
+
+def leg_endpoints(prev_item, item):
+    """prev_item -> item 路段的起终点坐标串 (origin, destination)；任一端缺少坐标时返回 None"""
     if not prev_item or not prev_item.latitude or not prev_item.longitude:
-        return
+        return None
+    if not item.latitude or not item.longitude:
+        return None
+
+    return f"{prev_item.longitude},{prev_item.latitude}", f"{item.longitude},{item.latitude}"
+
+
+def fetch_driving_route(amap_key, origin, destination):
+    """驾车路线（不访问数据库，可在线程池中执行）"""
+    driving_url = f"https://restapi.amap.com/v3/direction/driving?key={amap_key}&origin={origin}&destination={destination}&strategy=0&extensions=all"
+    driving_data = amap_http.get(driving_url).json()
+    if driving_data.get('status') != '1':  # 配额用尽、key 无效等
+        raise RuntimeError(f"AMap driving error: {driving_data.get('info')} ({driving_data.get('infocode')})")
+
+    if driving_data.get('route', {}).get('paths'):
+        path = driving_data['route']['paths'][0]
+        return {
+            'duration': int(path.get('duration', 0)),
+            'distance': int(path.get('distance', 0)),
+            'tolls': float(path.get('tolls', 0)),
+            'taxi_cost': float(driving_data['route'].get('taxi_cost', 0)),
+            'polyline': path.get('polyline', '')  # 路线坐标点
+        }
+    return None
+
+
+def fetch_transit_routes(amap_key, origin, destination):
+    """公交/地铁路线，取最优的前3条（不访问数据库，可在线程池中执行）"""
+    transit_url = f"https://restapi.amap.com/v3/direction/transit/integrated?key={amap_key}&origin={origin}&destination={destination}&city=全国&extensions=all"
+    transit_data = amap_http.get(transit_url).json()
+    if transit_data.get('status') != '1':
+        raise RuntimeError(f"AMap transit error: {transit_data.get('info')} ({transit_data.get('infocode')})")
+
+    if transit_data.get('route', {}).get('transits'):
+        transits = transit_data['route']['transits']
+        # 取最优的前3条路线
+        transit_routes = []
+        for t in transits[:3]:
+            segments = []
+            for seg in t.get('segments', []):
+                if seg.get('bus', {}).get('buslines'):
+                    busline = seg['bus']['buslines'][0]
+                    segments.append({
+                        'type': 'bus',
+                        'name': busline.get('name', ''),
+                        'departure_stop': busline.get('departure_stop', {}).get('name', ''),
+                        'arrival_stop': busline.get('arrival_stop', {}).get('name', ''),
+                        'via_num': busline.get('via_num', 0),
+                        'polyline': busline.get('polyline', '')
+                    })
+                elif seg.get('railway'):
+                    railway = seg['railway']
+                    segments.append({
+                        'type': 'railway',
+                        'name': railway.get('name', ''),
+                        'departure_stop': railway.get('departure_stop', {}).get('name', ''),
+                        'arrival_stop': railway.get('arrival_stop', {}).get('name', ''),
+                    })
+                if seg.get('walking', {}).get('distance'):
+                    walk_dist = int(seg['walking'].get('distance', 0))
+                    if walk_dist > 50:  # 超过50米的步行才记录
+                        segments.append({
+                            'type': 'walk',
+                            'distance': walk_dist,
+                            'duration': int(seg['walking'].get('duration', 0))
+                        })
+
+            transit_routes.append({
+                'duration': int(t.get('duration', 0)),
+                'distance': int(t.get('distance', 0)),
+                'walking_distance': int(t.get('walking_distance', 0)),
+                'cost': float(t.get('cost', 0)),
+                'segments': segments
+            })
+
+        return transit_routes
+    return None
+
 
+def cached_route_info(origin, destination):
+    """缓存中的路段路线，没有时返回 None"""
+    return amap_cache.get(amap_cache.make_key('route', {'origin': origin, 'destination': destination})) or None
+
+
+def has_route_info(transport_info):
+    """保存的路线是否至少有一种交通方式（'{}' 为旧版本写入的失败结果）"""
+    return bool(transport_info) and transport_info != '{}'
+
+
+def fetch_route_info(origin, destination):
+    """并发请求驾车和公交路线，耗时取两者中较慢的一个；没有任何一种交通方式成功时返回 None
+
+    两者都请求成功的结果按起终点缓存，行程来回调整顺序时不重复请求。
+    """
     amap_key = get_amap_key()
     if not amap_key:
-        return
+        return None
 
-    try:
-        origin = f"{prev_item.longitude},{prev_item.latitude}"
-        destination = f"{item.longitude},{item.latitude}"
-
-        route_info = {}
-
-        # 计算驾车路线
-        driving_url = f"https://restapi.amap.com/v3/direction/driving?key={amap_key}&origin={origin}&destination={destination}&strategy=0&extensions=all"
-        driving_resp = requests.get(driving_url, timeout=10)
-        driving_data = driving_resp.json()
-
-        if driving_data.get('status') == '1' and driving_data.get('route', {}).get('paths'):
-            path = driving_data['route']['paths'][0]
-            route_info['driving'] = {
-                'duration': int(path.get('duration', 0)),
-                'distance': int(path.get('distance', 0)),
-                'tolls': float(path.get('tolls', 0)),
-                'taxi_cost': float(driving_data['route'].get('taxi_cost', 0)),
-                'polyline': path.get('polyline', '')  # 路线坐标点
-            }
+    route_info = cached_route_info(origin, destination)
+    if route_info is not None:
+        return route_info
 
-        # 计算公交/地铁路线
-        transit_url = f"https://restapi.amap.com/v3/direction/transit/integrated?key={amap_key}&origin={origin}&destination={destination}&city=全国&extensions=all"
-        transit_resp = requests.get(transit_url, timeout=10)
-        transit_data = transit_resp.json()
-
-        if transit_data.get('status') == '1' and transit_data.get('route', {}).get('transits'):
-            transits = transit_data['route']['transits']
-            # 取最优的前3条路线
-            transit_routes = []
-            for t in transits[:3]:
-                segments = []
-                for seg in t.get('segments', []):
-                    if seg.get('bus', {}).get('buslines'):
-                        busline = seg['bus']['buslines'][0]
-                        segments.append({
-                            'type': 'bus',
-                            'name': busline.get('name', ''),
-                            'departure_stop': busline.get('departure_stop', {}).get('name', ''),
-                            'arrival_stop': busline.get('arrival_stop', {}).get('name', ''),
-                            'via_num': busline.get('via_num', 0),
-                            'polyline': busline.get('polyline', '')
-                        })
-                    elif seg.get('railway'):
-                        railway = seg['railway']
-                        segments.append({
-                            'type': 'railway',
-                            'name': railway.get('name', ''),
-                            'departure_stop': railway.get('departure_stop', {}).get('name', ''),
-                            'arrival_stop': railway.get('arrival_stop', {}).get('name', ''),
-                        })
-                    if seg.get('walking', {}).get('distance'):
-                        walk_dist = int(seg['walking'].get('distance', 0))
-                        if walk_dist > 50:  # 超过50米的步行才记录
-                            segments.append({
-                                'type': 'walk',
-                                'distance': walk_dist,
-                                'duration': int(seg['walking'].get('duration', 0))
-                            })
-
-                transit_routes.append({
-                    'duration': int(t.get('duration', 0)),
-                    'distance': int(t.get('distance', 0)),
-                    'walking_distance': int(t.get('walking_distance', 0)),
-                    'cost': float(t.get('cost', 0)),
-                    'segments': segments
-                })
+    futures = {
+        'driving': _route_pool.submit(fetch_driving_route, amap_key, origin, destination),
+        'transit': _route_pool.submit(fetch_transit_routes, amap_key, origin, destination),
+    }
+    route_info = {}
+    errors = 0
+    for mode, future in futures.items():
+        try:
+            result = future.result()
+        except Exception as e:
+            errors += 1
+            logger.warning(f'Route calculation error ({mode}) {origin} -> {destination}: {e!r}')
+            continue
+        if result:
+            route_info[mode] = result
+    if not route_info:
+        return None
+    if not errors:
+        amap_cache.set(amap_cache.make_key('route', {'origin': origin, 'destination': destination}),
+                       route_info, AMAP_CACHE_TTL['route'])
+    return route_info
+
+
+def apply_route_info(item, route_info, endpoints):
+    """把路线信息写入行程（默认使用驾车信息），并记录它对应的路段"""
+    if route_info.get('driving'):
+        item.transport_mode = 'driving'
+        item.transport_duration = route_info['driving']['duration'] // 60  # 转为分钟
+        item.transport_distance = route_info['driving']['distance']
+        item.transport_cost = route_info['driving'].get('taxi_cost', 0)
+
+    item.transport_info = json.dumps(route_info)
+    item.route_origin, item.route_destination = endpoints
+
+
+def clear_route_info(item):
+    """行程不再有前一个路段（成为当天第一个或前一个行程没有坐标）时清除自动计算的路线"""
+    item.transport_mode = None
+    item.transport_duration = None
+    item.transport_distance = None
+    item.transport_cost = None
+    item.transport_info = None
+    item.route_origin = item.route_destination = None
+    item.route_status = None
+
+
+class RouteJobQueue:
+    """路线计算任务队列 - 任务保存在 travel_route_jobs 表，由本进程的后台线程执行
+
+    - 行程再次入队时替换它尚未开始的旧任务；执行完成时若行程已移动则不写入旧路线
+    - 起终点相同的到期任务一次领取，只请求一次高德
+    - 失败后按指数退避（带抖动）自动重试，MAX_ATTEMPTS 次后标记为 failed
+    - 任务以租约方式领取，进程退出时执行中的任务在租约到期后被重新领取
+    workers 为 0 时在请求线程内直接执行（测试环境）。
+    """
+
+    MAX_ATTEMPTS = 4
+    RETRY_BASE = 5        # 首次重试等待（秒），之后每次翻倍
+    LEASE = 120           # 领取后的租约时长（秒）
+    POLL_INTERVAL = 10    # 空闲时检查到期重试任务的间隔（秒）
+
+    def __init__(self):
+        self.app = None
+        self.workers = 0
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('TRAVEL_ROUTE_WORKERS', 2)
+        self._start()
+
+    def _start(self):
+        # 线程不会跨 fork 保留（gunicorn preload），在新进程里重新启动
+        if not self.workers or (self._pid == os.getpid() and self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._worker, name=f'route-job-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def refresh_day(self, plan_id, day_number, force_ids=()):
+        """重新检查某一天相邻行程的路段，只重新计算起终点变化了的路线，返回各类处理的数量
+
+        自动计算的路线记录了对应的起终点 (route_origin, route_destination)，和当前前一个行程的坐标
+        比较即可知道是否过期；手动填写了交通信息的行程保持不变。force_ids 中的行程即使路段未变也重新计算
+        （仍可复用其他行程已保存的相同路段）。
+        变化的路段先复用已保存或已缓存的相同路段，其余的一次提交入队，由后台线程合并请求。
+        """
+        items = TravelItinerary.query.filter_by(plan_id=plan_id, day_number=day_number)\
+            .order_by(TravelItinerary.order_index.asc()).all()
+        queued_legs = set()
+        if items:
+            queued_legs = set(db.session.query(
+                TravelRouteJob.item_id, TravelRouteJob.origin, TravelRouteJob.destination
+            ).filter(
+                TravelRouteJob.item_id.in_([item.id for item in items]),
+                TravelRouteJob.status != 'failed'
+            ).all())
+
+        stale = {}
+        counts = {'unchanged': 0, 'cleared': 0, 'reused': 0, 'queued': 0}
+        # items 已按 order_index 排好序，相邻两项即一个路段，不再逐项查询前一个行程
+        for prev_item, item in zip([None] + items, items):
+            automatic = (item.route_origin is not None or item.id in force_ids
+                         or not (item.transport_mode or item.transport_info))
+            endpoints = leg_endpoints(prev_item, item)
+            if not automatic:
+                counts['unchanged'] += 1
+            elif endpoints is None:
+                if item.route_origin is not None or item.route_status or item.id in force_ids:
+                    self._replace_job(item, None)
+                    clear_route_info(item)
+                    counts['cleared'] += 1
+                else:
+                    counts['unchanged'] += 1
+            elif ((item.id, *endpoints) in queued_legs
+                  or (item.id not in force_ids and has_route_info(item.transport_info)
+                      and endpoints == (item.route_origin, item.route_destination))):
+                counts['unchanged'] += 1
+            else:
+                stale[item] = endpoints
+
+        # 已保存的相同路段（任意行程）一次查询取出
+        saved = {}
+        if stale:
+            rows = db.session.query(
+                TravelItinerary.route_origin, TravelItinerary.route_destination, TravelItinerary.transport_info
+            ).filter(
+                db.tuple_(TravelItinerary.route_origin, TravelItinerary.route_destination).in_(set(stale.values())),
+                TravelItinerary.transport_info.isnot(None),
+                TravelItinerary.transport_info != '{}'
+            ).all()
+            saved = {(origin, destination): info for origin, destination, info in rows}
+
+        for item, endpoints in stale.items():
+            route_info = json.loads(saved[endpoints]) if endpoints in saved else cached_route_info(*endpoints)
+            if route_info is not None:
+                self._replace_job(item, None)
+                apply_route_info(item, route_info, endpoints)
+                item.route_status = 'ready'
+                counts['reused'] += 1
+            else:
+                self._replace_job(item, endpoints)
+                counts['queued'] += 1
+        db.session.commit()
+
+        if counts['queued']:
+            if self.workers:
+                self._start()
+                self._wakeup.set()
+            else:
+                self.run_pending()
+        return counts
+
+    def _replace_job(self, item, endpoints):
+        """删除行程尚未开始的旧任务，endpoints 不为 None 时为新路段创建任务（由调用方提交）"""
+        TravelRouteJob.query.filter(
+            TravelRouteJob.item_id == item.id,
+            TravelRouteJob.status != 'running'
+        ).delete(synchronize_session=False)
+        if endpoints is None:
+            return None
+        job = TravelRouteJob(item_id=item.id, origin=endpoints[0], destination=endpoints[1])
+        db.session.add(job)
+        item.route_status = 'pending'
+        return job
+
+    def _worker(self):
+        while True:
+            self._wakeup.wait(self.POLL_INTERVAL)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    self.run_pending()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f'Route job worker error: {e}')
+
+    def run_pending(self):
+        """领取并执行所有到期任务，返回执行的任务数"""
+        processed = 0
+        while True:
+            job_ids = self._claim()
+            if not job_ids:
+                return processed
+            self._run(job_ids)
+            processed += len(job_ids)
+
+    def _claim(self):
+        """领取最早到期的任务以及同一路段的其他到期任务"""
+        now = datetime.utcnow()
+        due = db.or_(
+            db.and_(TravelRouteJob.status == 'pending', TravelRouteJob.next_run_at <= now),
+            db.and_(TravelRouteJob.status == 'running', TravelRouteJob.locked_until < now),
+        )
+        # 其他线程正在计算的路段先不领取，等它完成后直接复用结果
+        in_flight = db.aliased(TravelRouteJob)
+        leg_running = db.exists().where(
+            in_flight.status == 'running',
+            in_flight.locked_until >= now,
+            in_flight.origin == TravelRouteJob.origin,
+            in_flight.destination == TravelRouteJob.destination
+        )
+        first = TravelRouteJob.query.filter(due, ~leg_running).order_by(TravelRouteJob.next_run_at.asc()).first()
+        if not first:
+            db.session.rollback()
+            return []
+
+        # 条件更新 + RETURNING：多个线程/进程同时领取时每个任务只会被一方拿到
+        job_ids = db.session.execute(
+            db.update(TravelRouteJob).where(
+                due,
+                TravelRouteJob.origin == first.origin,
+                TravelRouteJob.destination == first.destination
+            ).values(
+                status='running',
+                locked_until=now + timedelta(seconds=self.LEASE),
+                attempts=TravelRouteJob.attempts + 1
+            ).returning(TravelRouteJob.id)
+        ).scalars().all()
+        db.session.commit()
+        return job_ids
+
+    def _run(self, job_ids):
+        jobs = TravelRouteJob.query.filter(TravelRouteJob.id.in_(job_ids)).all()
+        if not jobs:
+            return
+        origin, destination = jobs[0].origin, jobs[0].destination
+
+        route_info, error = None, None
+        try:
+            route_info = fetch_route_info(origin, destination)
+            if not route_info:  # 没有任何交通方式的结果也按失败重试，不写入空路线
+                route_info, error = None, '驾车和公交路线请求均失败'
+        except Exception as e:
+            error = str(e)
+
+        if route_info is not None:
+            # 执行期间新入队的同一路段任务直接使用这次的结果
+            jobs += TravelRouteJob.query.filter(
+                TravelRouteJob.origin == origin,
+                TravelRouteJob.destination == destination,
+                TravelRouteJob.status == 'pending'
+            ).all()
+
+        now = datetime.utcnow()
+        for job in jobs:
+            item = job.item
+            if route_info is not None:
+                # 行程在任务执行期间被移动（由新的任务写入）或改为手动填写交通信息时不写入
+                if (item and item.route_status == 'pending'
+                        and route_endpoints(item) == (job.origin, job.destination)):
+                    apply_route_info(item, route_info, (job.origin, job.destination))
+                    item.route_status = 'ready'
+                db.session.delete(job)
+            elif job.attempts >= self.MAX_ATTEMPTS:
+                job.status = 'failed'
+                job.last_error = error
+                job.locked_until = None
+                newer = TravelRouteJob.query.filter(
+                    TravelRouteJob.item_id == job.item_id,
+                    TravelRouteJob.id != job.id,
+                    TravelRouteJob.status != 'failed'
+                ).count()
+                if item and not newer:
+                    item.route_status = 'failed'
+            else:
+                delay = self.RETRY_BASE * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.5)
+                job.status = 'pending'
+                job.last_error = error
+                job.locked_until = None
+                job.next_run_at = now + timedelta(seconds=delay)
+        db.session.commit()
 
-            route_info['transit'] = transit_routes
 
-        # 默认使用驾车信息
-        if route_info.get('driving'):
-            item.transport_mode = 'driving'
-            item.transport_duration = route_info['driving']['duration'] // 60  # 转为分钟
-            item.transport_distance = route_info['driving']['distance']
-            item.transport_cost = route_info['driving'].get('taxi_cost', 0)
+route_jobs = RouteJobQueue()
 
-        item.transport_info = json.dumps(route_info)
 
+def refresh_day_routes(plan_id, day_number, force_ids=()):
+    """行程修改提交之后重新检查当天的路段；失败只记录日志，不影响已保存的修改（可再调用 /plans/<id>/routes 重新检查）"""
+    try:
+        route_jobs.refresh_day(plan_id, day_number, force_ids)
     except Exception as e:
-        print(f"Route calculation error: {e}")
+        db.session.rollback()
+        logger.warning(f'Route refresh failed for plan {plan_id} day {day_number}: {e}')
 
 
 # ==================== 旅行计划 CRUD ====================
@@ -422,19 +747,16 @@ def add_itinerary(user_id, plan_id):
             transport_info=json.dumps(data['transport_info']) if isinstance(data.get('transport_info'), dict) else data.get('transport_info'),
         )
         db.session.add(itinerary)
-        db.session.flush()  # 获取ID
-
-        # 只有在没有前端传入transport_mode时才自动计算路线
-        if not data.get('transport_mode'):
-            calculate_route_to_item(itinerary)
-        
         db.session.commit()
-        
-        return jsonify({'success': True, 'id': itinerary.id})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+    # 前端传入 transport_mode 时不自动计算；插入到当天中间时后一个行程的路线也随之更新（后台任务，进度见 route_status）
+    refresh_day_routes(plan_id, itinerary.day_number)
+
+    return jsonify({'success': True, 'id': itinerary.id, 'route_status': itinerary.route_status})
+
 
 @bp.route('/itineraries/<int:item_id>', methods=['PUT'])
 @require_auth
@@ -487,6 +809,12 @@ def update_itinerary(user_id, item_id):
         if 'notes' in data:
             item.notes = data['notes']
         # 交通信息（手动设置时跳过自动计算）
+        manual_transport = 'transport_mode' in data
+        if manual_transport:
+            # 手动填写的交通信息不对应自动计算的路段，之后调整顺序时也不会被覆盖
+            item.route_origin = item.route_destination = None
+            item.route_status = None
+            TravelRouteJob.query.filter_by(item_id=item.id, status='pending').delete(synchronize_session=False)
         if 'transport_mode' in data:
             item.transport_mode = data['transport_mode']
         if 'transport_duration' in data:
@@ -524,16 +852,18 @@ def update_itinerary(user_id, item_id):
             item.order_index != old_order
         )
         
-        # 只有在没有手动设置transport_mode的情况下才自动计算
-        if position_changed and 'transport_mode' not in data:
-            calculate_route_to_item(item)
-        
         db.session.commit()
-        return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+    # 原来所在的一天和现在的一天都可能有路段变化（本行程、原来和现在的后一个行程），后台任务，进度见 route_status
+    if position_changed:
+        force_ids = () if manual_transport else (item.id,)
+        for day in sorted({old_day, item.day_number}):
+            refresh_day_routes(item.plan_id, day, force_ids)
+    return jsonify({'success': True, 'route_status': item.route_status})
+
 
 @bp.route('/itineraries/<int:item_id>', methods=['DELETE'])
 @require_auth
@@ -547,9 +877,76 @@ def delete_itinerary(user_id, item_id):
         return jsonify({'success': False, 'error': '无权删除'}), 403
     
     try:
+        plan_id, day_number = item.plan_id, item.day_number
         db.session.delete(item)
         db.session.commit()
-        return jsonify({'success': True})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    # 后一个行程的前一站变了
+    refresh_day_routes(plan_id, day_number)
+    return jsonify({'success': True})
+
+
+@bp.route('/itineraries/<int:item_id>/route', methods=['GET'])
+@require_auth
+def get_itinerary_route(user_id, item_id):
+    """路线计算状态 - route_status 为 ready 时 transport_info 已可用"""
+    item = TravelItinerary.query.get(item_id)
+    if not item:
+        return jsonify({'success': False, 'error': '项目不存在'}), 404
+
+    if item.plan.user_id != user_id and not item.plan.shared:
+        return jsonify({'success': False, 'error': '无权访问'}), 403
+
+    job = TravelRouteJob.query.filter_by(item_id=item.id).order_by(TravelRouteJob.id.desc()).first()
+    return jsonify({
+        'success': True,
+        'route_status': item.route_status,
+        'transport_mode': item.transport_mode,
+        'transport_duration': item.transport_duration,
+        'transport_distance': item.transport_distance,
+        'transport_cost': item.transport_cost,
+        'transport_info': json.loads(item.transport_info) if item.transport_info else None,
+        'job': {
+            'status': job.status,
+            'attempts': job.attempts,
+            'last_error': job.last_error,
+            'next_run_at': job.next_run_at.isoformat() if job.next_run_at else None,
+        } if job else None,
+    })
+
+
+@bp.route('/plans/<int:plan_id>/routes', methods=['POST'])
+@require_auth
+def refresh_plan_routes(user_id, plan_id):
+    """重新检查计划中相邻行程的路段，只重新计算起终点变化了的路线
+
+    请求体（可选）: day_number 只检查这一天；force 为 true 时手动填写或旧数据中不知道
+    对应路段的交通信息也按当前顺序重新计算。
+    """
+    plan = TravelPlan.query.get(plan_id)
+    if not plan or plan.user_id != user_id:
+        return jsonify({'success': False, 'error': '无权操作'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get('day_number'):
+        days = [data['day_number']]
+    else:
+        days = [day for (day,) in db.session.query(TravelItinerary.day_number)
+                .filter_by(plan_id=plan_id).distinct().order_by(TravelItinerary.day_number)]
+
+    try:
+        totals = {'unchanged': 0, 'cleared': 0, 'reused': 0, 'queued': 0}
+        for day in days:
+            force_ids = ()
+            if data.get('force'):
+                force_ids = {item_id for (item_id,) in db.session.query(TravelItinerary.id)
+                             .filter_by(plan_id=plan_id, day_number=day)}
+            for key, value in route_jobs.refresh_day(plan_id, day, force_ids).items():
+                totals[key] += value
+        return jsonify({'success': True, **totals})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -557,6 +954,53 @@ def delete_itinerary(user_id, item_id):
 
 # ==================== 高德地图API代理 ====================
 
+# 成功结果的缓存时长（秒）
+AMAP_CACHE_TTL = {
+    'regeo': 30 * 86400,
+    'geocode': 30 * 86400,
+    'search': 86400,
+    'around': 86400,
+    'direction': 3600,
+    'route': 86400,  # 行程路段（驾车 + 公交）
+}
+
+
+def normalize_text(value):
+    """去掉首尾和重复空白"""
+    return ' '.join((value or '').split())
+
+
+def normalize_location(location, digits):
+    """'经度,纬度' 保留 digits 位小数（3 位约 100 米，5 位约 1 米），格式不对时原样返回"""
+    try:
+        lng, lat = (float(v) for v in location.split(','))
+    except ValueError:
+        return location.strip()
+    return f'{lng:.{digits}f},{lat:.{digits}f}'
+
+
+def amap_get(endpoint, url, params):
+    """请求高德API，成功结果按规范化后的参数缓存（不含 key）；返回响应 JSON"""
+    cache_key = amap_cache.make_key(f'{endpoint}:{url}', params)
+    data = amap_cache.get(cache_key)
+    g.amap_cache_status = 'HIT' if data is not None else 'MISS'
+    if data is None:
+        response = amap_http.get(url, params={'key': get_amap_key(), **params})
+        data = response.json()
+        if data.get('status') == '1':
+            amap_cache.set(cache_key, data, AMAP_CACHE_TTL[endpoint])
+    return data
+
+
+@bp.after_request
+def add_amap_cache_header(response):
+    """代理接口标注缓存命中情况: X-Cache: HIT / MISS"""
+    status = g.get('amap_cache_status')
+    if status:
+        response.headers['X-Cache'] = status
+    return response
+
+
 @bp.route('/amap/regeo', methods=['GET'])
 @require_auth
 def amap_regeo(user_id):
@@ -572,13 +1016,12 @@ def amap_regeo(user_id):
     try:
         url = 'https://restapi.amap.com/v3/geocode/regeo'
         params = {
-            'key': amap_key,
-            'location': location,
+            # 只用于取城市/区县，附近的坐标共用一条缓存
+            'location': normalize_location(location, 3),
             'extensions': 'base',
         }
 
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = amap_get('regeo', url, params)
 
         if data.get('status') == '1' and data.get('regeocode'):
             addr = data['regeocode'].get('addressComponent', {})
@@ -615,9 +1058,9 @@ def amap_search(user_id):
     if not amap_key:
         return jsonify({'success': False, 'error': '请配置高德地图API Key'}), 500
     
-    keywords = request.args.get('keywords', '')
-    city = request.args.get('city', '')
-    types = request.args.get('types', '')  # POI类型
+    keywords = normalize_text(request.args.get('keywords', ''))
+    city = normalize_text(request.args.get('city', ''))
+    types = normalize_text(request.args.get('types', ''))  # POI类型
     
     if not keywords:
         return jsonify({'success': False, 'error': '请输入搜索关键词'}), 400
@@ -625,7 +1068,6 @@ def amap_search(user_id):
     try:
         url = 'https://restapi.amap.com/v3/place/text'
         params = {
-            'key': amap_key,
             'keywords': keywords,
             'city': city,
             'types': types,
@@ -633,8 +1075,7 @@ def amap_search(user_id):
             'extensions': 'all'
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = amap_get('search', url, params)
         
         if data.get('status') == '1':
             pois = []
@@ -668,9 +1109,9 @@ def amap_around(user_id):
         return jsonify({'success': False, 'error': '请配置高德地图API Key'}), 500
     
     location = request.args.get('location', '')  # 经度,纬度
-    keywords = request.args.get('keywords', '')
-    types = request.args.get('types', '')
-    radius = request.args.get('radius', 3000)
+    keywords = normalize_text(request.args.get('keywords', ''))
+    types = normalize_text(request.args.get('types', ''))
+    radius = request.args.get('radius', 3000, type=int)
     
     if not location:
         return jsonify({'success': False, 'error': '请提供位置坐标'}), 400
@@ -678,8 +1119,7 @@ def amap_around(user_id):
     try:
         url = 'https://restapi.amap.com/v3/place/around'
         params = {
-            'key': amap_key,
-            'location': location,
+            'location': normalize_location(location, 4),
             'keywords': keywords,
             'types': types,
             'radius': radius,
@@ -687,8 +1127,7 @@ def amap_around(user_id):
             'extensions': 'all'
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = amap_get('around', url, params)
         
         if data.get('status') == '1':
             pois = []
@@ -736,17 +1175,15 @@ def amap_direction(user_id):
             url = 'https://restapi.amap.com/v3/direction/transit/integrated'
         
         params = {
-            'key': amap_key,
-            'origin': origin,
-            'destination': destination,
+            'origin': normalize_location(origin, 5),
+            'destination': normalize_location(destination, 5),
             'extensions': 'all'
         }
         
         if mode == 'transit':
-            params['city'] = request.args.get('city', '北京')
+            params['city'] = normalize_text(request.args.get('city', '北京'))
         
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = amap_get('direction', url, params)
         
         if data.get('status') == '1':
             route = data.get('route', {})
@@ -789,8 +1226,8 @@ def amap_geocode(user_id):
     if not amap_key:
         return jsonify({'success': False, 'error': '请配置高德地图API Key'}), 500
     
-    address = request.args.get('address', '')
-    city = request.args.get('city', '')
+    address = normalize_text(request.args.get('address', ''))
+    city = normalize_text(request.args.get('city', ''))
     
     if not address:
         return jsonify({'success': False, 'error': '请输入地址'}), 400
@@ -798,13 +1235,11 @@ def amap_geocode(user_id):
     try:
         url = 'https://restapi.amap.com/v3/geocode/geo'
         params = {
-            'key': amap_key,
             'address': address,
             'city': city
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = amap_get('geocode', url, params)
         
         if data.get('status') == '1' and data.get('geocodes'):
             geo = data['geocodes'][0]
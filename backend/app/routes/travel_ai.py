@@ -1,10 +1,10 @@
 """AI Travel Planning routes - AI旅行规划路由（Function Calling模式）"""
 from flask import Blueprint, request, jsonify, current_app
 import json
-import requests
 from datetime import datetime
 from models import db, TravelPlan, TravelItinerary
 from app.utils.decorators import require_auth
+from app.utils.http_client import amap_http, dashscope_http
 
 bp = Blueprint('travel_ai', __name__, url_prefix='/api/travel/ai')
 
@@ -201,7 +201,7 @@ def call_qwen_api(messages, api_key, tools=None, model='qwen-plus'):
         data['parameters']['tools'] = tools
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        response = dashscope_http.post(url, headers=headers, json=data)
         result = response.json()
 
         if 'output' in result and 'choices' in result['output']:
@@ -428,7 +428,7 @@ def execute_tool(tool_name, arguments, user_id):
                 'extensions': 'all'
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = amap_http.get(url, params=params)
             data = response.json()
 
             if data.get('status') == '1':
@@ -0,0 +1,9 @@
+"""Socket.IO namespaces initialization."""
+from . import chat
+from . import poker
+
+# All namespaces to register
+all_namespaces = [
+    chat.ChatNamespace(chat.NAMESPACE),
+    poker.PokerNamespace(poker.NAMESPACE),
+]
@@ -0,0 +1,27 @@
+"""Socket.IO connection authentication."""
+from flask import session
+
+
+def get_socket_user_id(auth=None):
+    """Resolve the user of a Socket.IO connection.
+
+    Browsers carry the Flask session cookie on the handshake; the Tauri
+    client has no cookie and passes its JWT as ``auth={'token': ...}``.
+    """
+    if 'user_id' in session:
+        return session['user_id']
+
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    if token:
+        from app.routes.auth import verify_token
+        payload = verify_token(token)
+        if payload:
+            session['user_id'] = payload['user_id']
+            session['username'] = payload['username']
+            return payload['user_id']
+    return None
+
+
+def user_room(user_id):
+    """Room joined by every connected tab of a user."""
+    return f'user_{user_id}'
@@ -0,0 +1,22 @@
+"""Chat push channel - replaces polling of /api/chat/messages."""
+from flask_socketio import Namespace, join_room
+from app.extensions import socketio
+from .auth import get_socket_user_id, user_room
+
+NAMESPACE = '/chat'
+
+
+class ChatNamespace(Namespace):
+    """Server -> client events: ``message`` and ``reaction``."""
+
+    def on_connect(self, auth=None):
+        user_id = get_socket_user_id(auth)
+        if not user_id:
+            return False
+        join_room(user_room(user_id))
+
+
+def push_to_users(event, payload, user_ids):
+    """Emit a chat event to the given users (after the change is committed)."""
+    for user_id in set(user_ids):
+        socketio.emit(event, payload, namespace=NAMESPACE, to=user_room(user_id))
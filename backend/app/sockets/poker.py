@@ -0,0 +1,58 @@
+"""Poker push channel - one room per game, replaces state polling."""
+from flask import session
+from flask_socketio import Namespace, emit, join_room, leave_room
+from app.extensions import socketio
+from app.games import poker_manager
+from .auth import get_socket_user_id, user_room
+
+NAMESPACE = '/poker'
+
+
+def game_room(game_id):
+    """Room joined by every seated user watching a game."""
+    return f'game_{game_id}'
+
+
+class PokerNamespace(Namespace):
+    """Client -> server: ``join`` / ``leave`` with ``{'game_id': ...}``.
+
+    Server -> client: ``state`` (full state on join), ``action``,
+    ``hand_over``, ``new_hand`` (deltas without hole cards) and
+    ``hole_cards`` (sent only to the seat's owner).
+    """
+
+    def on_connect(self, auth=None):
+        user_id = get_socket_user_id(auth)
+        if not user_id:
+            return False
+        join_room(user_room(user_id))
+
+    def on_join(self, data):
+        game_id = _game_id(data)
+        state = poker_manager.get_game_state(game_id, requesting_user_id=session.get('user_id')) if game_id else None
+        if not state or 'error' in state or state['my_position'] is None:
+            emit('error', {'game_id': game_id, 'error': 'Game not found'})
+            return
+        join_room(game_room(game_id))
+        emit('state', state)
+
+    def on_leave(self, data):
+        game_id = _game_id(data)
+        if game_id:
+            leave_room(game_room(game_id))
+
+
+def _game_id(data):
+    try:
+        return int((data or {}).get('game_id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def push_game_event(game_id, event, payload, user_id=None):
+    """PokerManager listener: broadcast deltas to the game room, private data to one user."""
+    room = user_room(user_id) if user_id else game_room(game_id)
+    socketio.emit(event, payload, namespace=NAMESPACE, to=room)
+
+
+poker_manager.add_listener(push_game_event)
@@ -8,6 +8,7 @@ from .validators import (
     get_asset_categories,
     allowed_file
 )
+from .downsample import DEFAULT_MAX_POINTS, lttb_indices, downsample_indices
 
 __all__ = [
     'require_auth',
@@ -16,5 +17,8 @@ __all__ = [
     'get_category_colors',
     'validate_category',
     'get_asset_categories',
-    'allowed_file'
+    'allowed_file',
+    'DEFAULT_MAX_POINTS',
+    'lttb_indices',
+    'downsample_indices'
 ]
@@ -0,0 +1,140 @@
+"""Response cache for external API proxies - SQLite file with TTL and LRU eviction."""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """JSON values keyed on normalized request parameters.
+
+    Backed by a local SQLite file, so entries are shared by worker processes and survive
+    restarts. Entries expire after their TTL; once the table grows past max_entries the
+    least recently used ones are evicted. Cache errors are logged and treated as misses.
+    """
+
+    EVICT_EVERY = 100        # check expiry and size every N writes
+    TOUCH_INTERVAL = 60      # seconds between last_used updates of the same entry
+
+    def __init__(self, config_prefix, default_filename):
+        self.config_prefix = config_prefix
+        self.default_filename = default_filename
+        self.path = None
+        self.max_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+
+    def init_app(self, app):
+        """Read {prefix}_PATH / {prefix}_MAX_ENTRIES; MAX_ENTRIES = 0 disables the cache."""
+        self.max_entries = app.config.get(f'{self.config_prefix}_MAX_ENTRIES', 5000)
+        if not self.max_entries:
+            self.path = None
+            return
+        self.path = (app.config.get(f'{self.config_prefix}_PATH')
+                     or os.path.join(app.instance_path, self.default_filename))
+        self._local = threading.local()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, '
+                'value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, '
+                'last_used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_last_used ON response_cache (last_used)')
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            if self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(namespace, params):
+        """Stable key for a namespace and a dict of already-normalized parameters."""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return f'{namespace}:{hashlib.sha1(payload.encode()).hexdigest()}'
+
+    def get(self, key):
+        """Cached value, or None on a miss (absent, expired or cache disabled)."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value, expires_at, last_used FROM response_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                with conn:
+                    conn.execute('UPDATE response_cache SET last_used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f'Response cache read failed: {e}')
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl):
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT INTO response_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET value = excluded.value, '
+                    'expires_at = excluded.expires_at, last_used = excluded.last_used',
+                    (key, json.dumps(value, ensure_ascii=False), now + ttl, now)
+                )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f'Response cache write failed: {e}')
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM response_cache WHERE expires_at <= ?', (time.time(),))
+            count = conn.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    'DELETE FROM response_cache WHERE key IN ('
+                    'SELECT key FROM response_cache ORDER BY last_used ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+
+    def stats(self):
+        """Entry count and this process's hit/miss counters."""
+        entries = 0
+        if self.enabled:
+            entries = self._connect().execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+        return {'enabled': self.enabled, 'entries': entries, 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
+
+
+# 高德地图代理接口的共享缓存
+amap_cache = ResponseCache('AMAP_CACHE', 'amap_cache.db')
@@ -0,0 +1,62 @@
+"""Time series downsampling for charts (Largest-Triangle-Three-Buckets)."""
+
+DEFAULT_MAX_POINTS = 100
+MIN_POINTS = 3
+
+
+def lttb_indices(xs, ys, max_points):
+    """Indices of at most max_points points chosen by LTTB.
+
+    The first and last points are always kept; each bucket in between keeps the point
+    forming the largest triangle with the previously kept point and the next bucket's
+    average, so spikes and dips survive where every-k-th sampling would drop them.
+    """
+    n = len(xs)
+    if max_points >= n or max_points < MIN_POINTS:
+        return list(range(n))
+
+    indices = [0]
+    bucket_size = (n - 2) / (max_points - 2)
+    a = 0
+    for i in range(max_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+
+        next_xs = xs[end:next_end] or xs[-1:]
+        next_ys = ys[end:next_end] or ys[-1:]
+        avg_x = sum(next_xs) / len(next_xs)
+        avg_y = sum(next_ys) / len(next_ys)
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        indices.append(best)
+        a = best
+
+    indices.append(n - 1)
+    return indices
+
+
+def downsample_indices(xs, series, max_points=DEFAULT_MAX_POINTS):
+    """Shared indices for several series plotted against the same xs.
+
+    Runs LTTB on every series and merges the picks, shrinking the per-series budget until
+    the union fits in max_points.
+    """
+    n = len(xs)
+    series = [ys for ys in series if ys]
+    if n <= max_points or not series:
+        return list(range(n))
+
+    budget = max_points
+    while True:
+        picked = set()
+        for ys in series:
+            picked.update(lttb_indices(xs, ys, budget))
+        if len(picked) <= max_points or budget <= MIN_POINTS:
+            return sorted(picked)
+        budget = max(MIN_POINTS, budget * max_points // len(picked) - 1)
@@ -0,0 +1,103 @@
+"""Shared outbound HTTP clients - pooled keep-alive sessions with retries."""
+import os
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class JitteredRetry(Retry):
+    """Exponential backoff scaled by a random factor, so concurrent callers do not retry in lockstep."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff * random.uniform(0.5, 1.5) if backoff else 0
+
+
+class HttpClient:
+    """requests.Session per process with a bounded connection pool and retry policy.
+
+    Reuses TCP/TLS connections across requests. Retries connection errors with jittered backoff;
+    read timeouts and 429/5xx responses are retried only for idempotent clients, since the server
+    may already have done (and billed) the work of a non-idempotent call such as LLM generation.
+    Timeouts are (connect, read).
+    Configured from {prefix}_READ_TIMEOUT plus the shared HTTP_* settings.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, config_prefix, read_timeout, idempotent=True):
+        self.config_prefix = config_prefix
+        self.idempotent = idempotent
+        self.connect_timeout = 3.05
+        self.read_timeout = read_timeout
+        self.max_retries = 2
+        self.backoff_factor = 0.3
+        self.pool_maxsize = 10
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.connect_timeout = app.config.get('HTTP_CONNECT_TIMEOUT', self.connect_timeout)
+        self.read_timeout = app.config.get(f'{self.config_prefix}_READ_TIMEOUT', self.read_timeout)
+        self.max_retries = app.config.get('HTTP_MAX_RETRIES', self.max_retries)
+        self.backoff_factor = app.config.get('HTTP_BACKOFF_FACTOR', self.backoff_factor)
+        self.pool_maxsize = app.config.get('HTTP_POOL_MAXSIZE', self.pool_maxsize)
+        self.close()
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def _build_session(self):
+        retry = JitteredRetry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries if self.idempotent else 0,
+            status=self.max_retries if self.idempotent else 0,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=None,  # the read/status counts above decide, for GET and POST alike
+            backoff_factor=self.backoff_factor,
+            raise_on_status=False,  # hand the last response back so callers can read the error body
+            respect_retry_after_header=False,  # keep the wait bounded by backoff_factor
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @property
+    def session(self):
+        # A session must not be shared across fork (gunicorn workers); rebuild per process
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._session = None
+
+
+# 高德地图 Web 服务（GET，幂等，读超时也重试）
+amap_http = HttpClient('AMAP', read_timeout=10)
+# 通义千问 DashScope（生成不幂等，只重试连接错误；读超时和 429/5xx 不重试，避免重复计费和成倍等待）
+dashscope_http = HttpClient('DASHSCOPE', read_timeout=60, idempotent=False)
@@ -47,12 +47,16 @@ class Photo(db.Model):
     caption = db.Column(db.Text)
     created_at = db.Column(db.DateTime, server_default=func.now())
 
+    __table_args__ = (db.Index('ix_photo_created_at', 'created_at'),)
+
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, server_default=func.now())
 
+    __table_args__ = (db.Index('ix_message_created_at', 'created_at'),)
+
 class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -76,6 +80,12 @@ class Event(db.Model):
     parent_event = db.relationship('Event', remote_side=[id], foreign_keys=[parent_event_id])
     child_events = db.relationship('Event', foreign_keys=[parent_event_id], backref=db.backref('parent', remote_side=[id]))
 
+    __table_args__ = (
+        db.Index('ix_event_start_time', 'start_time'),
+        db.Index('ix_event_user_id', 'user_id'),
+        db.Index('ix_event_invited_user', 'invited_user'),
+    )
+
     # 定义重复类型
     RECURRENCE_TYPES = {
         'daily': '每天',
@@ -101,7 +111,47 @@ class AssetCategoryHistory(db.Model):
     created_at = db.Column(db.DateTime, server_default=func.now())
 
     # 复合唯一约束：每个日期每个分类只有一条记录
-    __table_args__ = (db.UniqueConstraint('date', 'category', name='_date_category_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('date', 'category', name='_date_category_uc'),
+        db.Index('ix_asset_category_history_category_date', 'category', 'date'),
+    )
+
+class AssetHistoryRollup(db.Model):
+    """资产历史汇总表 - 按周/月保存期初、最低、最高、期末总资产，用于长时间范围的折线图"""
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # 'week' 或 'month'
+    period_start = db.Column(db.Date, nullable=False)  # 周一 / 当月 1 日
+    first_date = db.Column(db.Date)  # 期内第一条日记录的日期
+    first_value = db.Column(db.Float)  # 期初总资产
+    min_date = db.Column(db.Date)  # 期内最低值所在日期
+    min_value = db.Column(db.Float)  # 期内最低总资产
+    max_date = db.Column(db.Date)  # 期内最高值所在日期
+    max_value = db.Column(db.Float)  # 期内最高总资产
+    last_date = db.Column(db.Date, nullable=False)  # 期内最后一条日记录的日期
+    total_assets = db.Column(db.Float, default=0)  # 期末总资产（即 last_date 当日的值）
+
+    __table_args__ = (
+        db.UniqueConstraint('period', 'period_start', name='_period_start_uc'),
+    )
+
+class AssetCategoryHistoryRollup(db.Model):
+    """资产分类历史汇总表 - 按周/月保存各分类期初、最低、最高、期末金额"""
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(20), nullable=False)
+    first_date = db.Column(db.Date)
+    first_value = db.Column(db.Float)
+    min_date = db.Column(db.Date)
+    min_value = db.Column(db.Float)
+    max_date = db.Column(db.Date)
+    max_value = db.Column(db.Float)
+    last_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(db.Float, default=0)  # 期末金额
+
+    __table_args__ = (
+        db.UniqueConstraint('period', 'period_start', 'category', name='_period_start_category_uc'),
+    )
 
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -111,6 +161,7 @@ class ChatMessage(db.Model):
     image_filename = db.Column(db.String(200))  # 图片文件名
     message_type = db.Column(db.String(20), default='text')  # 'text' 或 'image'
     is_read = db.Column(db.Boolean, default=False)  # 是否已读
+    reaction_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 表情反应最后变更的版本号
     created_at = db.Column(db.DateTime, server_default=func.now())
 
     # 关系
@@ -118,6 +169,11 @@ class ChatMessage(db.Model):
     receiver = db.relationship('User', foreign_keys=[receiver_id])
     reactions = db.relationship('ChatReaction', backref='message', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_chat_message_created_at', 'created_at'),
+        db.Index('ix_chat_message_reaction_version', 'reaction_version'),
+    )
+
 
 class ChatReaction(db.Model):
     """聊天消息表情反应"""
@@ -133,6 +189,11 @@ class ChatReaction(db.Model):
     # 每个用户对每条消息只能添加一个相同的表情
     __table_args__ = (db.UniqueConstraint('message_id', 'user_id', 'emoji', name='_message_user_emoji_uc'),)
 
+class ChatCounter(db.Model):
+    """聊天计数器 - 表情反应版本号在同一事务内原子递增分配，并发的反应变化不会拿到相同版本"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
 # 德扑相关模型
 class PokerGame(db.Model):
     """德扑游戏记录"""
@@ -154,6 +215,8 @@ class PokerGame(db.Model):
     players = db.relationship('PokerPlayer', backref='game', lazy=True, cascade='all, delete-orphan')
     hands = db.relationship('PokerHand', backref='game', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (db.Index('ix_poker_games_created_by_created_at', 'created_by', 'created_at'),)
+
 class PokerPlayer(db.Model):
     """德扑游戏玩家"""
     __tablename__ = 'poker_players'
@@ -172,6 +235,11 @@ class PokerPlayer(db.Model):
     user = db.relationship('User', foreign_keys=[user_id])
     actions = db.relationship('PokerAction', backref='player', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_poker_players_game_id_position', 'game_id', 'position'),
+        db.Index('ix_poker_players_game_id_user_id', 'game_id', 'user_id'),
+    )
+
 class PokerHand(db.Model):
     """德扑手牌记录"""
     __tablename__ = 'poker_hands'
@@ -179,6 +247,7 @@ class PokerHand(db.Model):
     game_id = db.Column(db.Integer, db.ForeignKey('poker_games.id'), nullable=False)
     hand_number = db.Column(db.Integer, default=1)  # 手牌序号
     community_cards = db.Column(db.Text)  # JSON存储公共牌
+    hole_cards = db.Column(db.Text)  # JSON存储各座位底牌 {position: "As Kd"}
     pot_size = db.Column(db.Integer, default=0)  # 底池大小
     winner_id = db.Column(db.Integer, db.ForeignKey('poker_players.id'))  # 获胜者
     hand_result = db.Column(db.String(100))  # 'royal_flush', 'full_house', etc.
@@ -188,6 +257,8 @@ class PokerHand(db.Model):
     winner = db.relationship('PokerPlayer', foreign_keys=[winner_id])
     actions = db.relationship('PokerAction', backref='hand', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (db.Index('ix_poker_hands_game_id_hand_number', 'game_id', 'hand_number'),)
+
 class PokerAction(db.Model):
     """德扑玩家操作记录"""
     __tablename__ = 'poker_actions'
@@ -199,6 +270,8 @@ class PokerAction(db.Model):
     betting_round = db.Column(db.String(20), nullable=False)  # 'preflop', 'flop', 'turn', 'river'
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_poker_actions_hand_id', 'hand_id'),)
+
 class PokerConfig(db.Model):
     """德扑配置"""
     __tablename__ = 'poker_configs'
@@ -241,6 +314,8 @@ class TravelPlan(db.Model):
     user = db.relationship('User', foreign_keys=[user_id])
     itineraries = db.relationship('TravelItinerary', backref='plan', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (db.Index('ix_travel_plans_user_id', 'user_id'),)
+
 
 class TravelItinerary(db.Model):
     """行程项目 - 每个景点/活动"""
@@ -279,6 +354,9 @@ class TravelItinerary(db.Model):
     transport_distance = db.Column(db.Integer)  # 通勤距离（米）
     transport_cost = db.Column(db.Float)  # 交通费用
     transport_info = db.Column(db.Text)  # 交通详情（JSON）
+    route_status = db.Column(db.String(20))  # 路线计算状态: pending/ready/failed，None 表示无需计算
+    route_origin = db.Column(db.String(50))  # 自动计算的路线对应的起点（经度,纬度），手动填写的交通信息为 None
+    route_destination = db.Column(db.String(50))  # 自动计算的路线对应的终点
 
     # 交通类型专用字段（用于高铁/飞机/大巴等需要起终点的交通）
     from_location_name = db.Column(db.String(200))  # 出发地名称
@@ -292,6 +370,13 @@ class TravelItinerary(db.Model):
     check_in_day = db.Column(db.Integer)    # 入住日 (day_number)
     check_out_day = db.Column(db.Integer)   # 退房日 (day_number)
 
+    route_jobs = db.relationship('TravelRouteJob', backref='item', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_travel_itineraries_plan_day_order', 'plan_id', 'day_number', 'order_index'),
+        db.Index('ix_travel_itineraries_route_leg', 'route_origin', 'route_destination'),
+    )
+
     # 类型常量
     CATEGORIES = {
         'attraction': '景点',
@@ -301,7 +386,29 @@ class TravelItinerary(db.Model):
     }
 
 
+class TravelRouteJob(db.Model):
+    """路线计算任务 - 行程新增/移动后，在后台计算从前一个行程到该行程的路线"""
+    __tablename__ = 'travel_route_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('travel_itineraries.id'), nullable=False)
+    origin = db.Column(db.String(50), nullable=False)  # 起点 经度,纬度
+    destination = db.Column(db.String(50), nullable=False)  # 终点 经度,纬度
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending/running/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # 已执行次数
+    last_error = db.Column(db.Text)
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 重试时间
+    locked_until = db.Column(db.DateTime)  # 执行中任务的租约到期时间，进程退出后到期可被重新领取
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_travel_route_jobs_status_next_run', 'status', 'next_run_at'),
+        db.Index('ix_travel_route_jobs_endpoints', 'origin', 'destination'),
+        db.Index('ix_travel_route_jobs_item', 'item_id'),
+    )
+
+
 # 学习测验相关模型
+
 class LearningQuestion(db.Model):
     """学习测验题目"""
     __tablename__ = 'learning_questions'
@@ -322,6 +429,8 @@ class LearningQuestion(db.Model):
 
     answers = db.relationship('LearningAnswer', backref='question', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (db.Index('ix_learning_questions_batch_date_index', 'batch_date', 'batch_index'),)
+
 
 class LearningAnswer(db.Model):
     """用户答题记录"""
@@ -336,4 +445,8 @@ class LearningAnswer(db.Model):
 
     user = db.relationship('User', foreign_keys=[user_id])
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'question_id', name='_user_question_uc'),)
\ No newline at end of file
+    # 唯一约束同时充当 (user_id, question_id) 索引
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'question_id', name='_user_question_uc'),
+        db.Index('ix_learning_answers_question_id', 'question_id'),
+    )
\ No newline at end of file
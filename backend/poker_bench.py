@@ -0,0 +1,225 @@
+"""
+德扑无头模拟与吞吐基准
+
+不依赖 Flask 和数据库：PokerManager 使用 NullPersistence + 内存存储，
+全 AI 桌通过 create_game / execute_single_ai_action / new_hand 连续打 N 手牌，
+报告每秒手数、单次动作延迟 p50/p99 和内存分配。
+
+用法:
+    python poker_bench.py --hands 2000 --players 6 --difficulty medium
+    python poker_bench.py --hands 500 --seed 42        # 固定种子，结果可复现（digest 相同）
+    python poker_bench.py --hands 500 --trace-alloc    # 统计内存分配（会明显变慢）
+    python poker_bench.py --hands 500 --json           # 输出 JSON，便于记录回归
+    python poker_bench.py --stress 16 --tables 1       # 16 个线程同时操作同一桌，检查并发安全
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import tracemalloc
+
+from app.games import equity
+from app.games.poker_manager import PokerManager
+from app.games.poker_persistence import NullPersistence
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_benchmark(hands, players=6, difficulty='medium', seed=None, trace_alloc=False):
+    """打 hands 手全 AI 牌局，返回统计结果"""
+    if seed is not None:
+        # 牌堆洗牌和 AI 决策都使用全局 random；蒙特卡洛胜率关闭时间预算后按迭代次数确定
+        random.seed(seed)
+        equity.TIME_BUDGET = 0
+        equity.clear_cache()
+
+    manager = PokerManager(persistence=NullPersistence())
+    latencies = []
+    digest = hashlib.sha1()
+    games = 0
+    played = 0
+
+    if trace_alloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+
+    while played < hands:
+        game_id = manager.create_game(None, ai_difficulty=difficulty, ai_player_count=players)
+        games += 1
+
+        while played < hands:
+            while True:
+                t0 = time.perf_counter()
+                result = manager.execute_single_ai_action(game_id)
+                latencies.append(time.perf_counter() - t0)
+                if result.get('no_action'):
+                    break
+                state = result['game_state']
+                digest.update(repr(state['last_action']).encode())
+                if state['is_hand_over']:
+                    break
+
+            played += 1
+            state = manager.get_game_state(game_id)
+            digest.update(repr([p['chips'] for p in state['players']]).encode())
+            if state['is_game_over']:
+                break
+            manager.new_hand(game_id)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'hands': played,
+        'games': games,
+        'actions': len(latencies),
+        'seconds': round(elapsed, 3),
+        'hands_per_sec': round(played / elapsed, 1) if elapsed else 0.0,
+        'actions_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': 0.0,
+        'p99_ms': 0.0,
+        'max_ms': 0.0,
+        'digest': digest.hexdigest()[:16],
+    }
+    latencies.sort()
+    if latencies:
+        stats['p50_ms'] = round(percentile(latencies, 0.50) * 1000, 3)
+        stats['p99_ms'] = round(percentile(latencies, 0.99) * 1000, 3)
+        stats['max_ms'] = round(latencies[-1] * 1000, 3)
+
+    if trace_alloc:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats['alloc_current_kb'] = round(current / 1024, 1)
+        stats['alloc_peak_kb'] = round(peak / 1024, 1)
+        stats['alloc_top'] = [
+            f'{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size / 1024:.1f} KiB'
+            for stat in snapshot.statistics('lineno')[:5]
+        ]
+
+    return stats
+
+
+def run_stress(threads, ops=500, tables=1, players=5, seed=None):
+    """多个线程混合调用 get_game_state / make_action / ai_step / new_hand
+
+    线程按轮转分配到 tables 张桌（每桌一名真人 user_id=1）。每次操作后检查
+    筹码守恒（筹码 + 底池 = 总买入），记录异常和违反次数。
+    """
+    if seed is not None:
+        random.seed(seed)
+    manager = PokerManager(persistence=NullPersistence())
+    buy_in = 1000
+    game_ids = [manager.create_game(1, ai_player_count=players, buy_in=buy_in) for _ in range(tables)]
+    counters = {'ops': 0, 'errors': 0, 'violations': 0, 'hands': 0}
+    counter_lock = threading.Lock()
+
+    def check(game_id):
+        # 在对局锁内读取引擎状态: 筹码 + 所有底池（含本轮下注）应等于总买入
+        with manager._game_lock(game_id):
+            th = manager.store.get(game_id)['th_game']
+            total = sum(p.chips for p in th.players)
+            if th.is_hand_running():
+                total += sum(pot.get_total_amount() for pot in th.pots)
+            return 0 if total == buy_in * len(th.players) else 1
+
+    def worker(index):
+        rng = random.Random(index if seed is None else seed * 1000 + index)
+        slot = index % tables
+        errors = violations = hands = 0
+        for _ in range(ops):
+            game_id = game_ids[slot]
+            try:
+                state = manager.get_game_state(game_id, requesting_user_id=1)
+                if state['is_game_over']:
+                    # 同一张桌只需要一个线程补开新桌
+                    with counter_lock:
+                        if game_ids[slot] == game_id:
+                            game_ids[slot] = manager.create_game(1, ai_player_count=players, buy_in=buy_in)
+                    continue
+                if state['is_hand_over']:
+                    result = manager.new_hand(game_id, requesting_user_id=1)
+                    hands += result.get('game_state', state)['hand_number'] > state['hand_number']
+                elif state['current_player'] == state['my_position'] and rng.random() < 0.7:
+                    legal = [a for a in state['legal_actions'] if a != 5] or [1]
+                    result = manager.make_action(game_id, 1, rng.choice(legal))
+                else:
+                    result = manager.execute_single_ai_action(game_id, requesting_user_id=1)
+                if 'error' not in result:
+                    violations += check(game_id)
+            except Exception:
+                errors += 1
+        with counter_lock:
+            counters['ops'] += ops
+            counters['errors'] += errors
+            counters['violations'] += violations
+            counters['hands'] += hands
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'threads': threads,
+        'tables': tables,
+        **counters,
+        'seconds': round(elapsed, 3),
+        'ops_per_sec': round(counters['ops'] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='德扑无头模拟与吞吐基准')
+    parser.add_argument('--hands', type=int, default=1000, help='模拟手数')
+    parser.add_argument('--players', type=int, default=6, help='每桌 AI 数量（2-8）')
+    parser.add_argument('--difficulty', default='medium', choices=['easy', 'medium', 'hard'])
+    parser.add_argument('--seed', type=int, default=None, help='固定随机种子，结果可复现')
+    parser.add_argument('--trace-alloc', action='store_true', help='使用 tracemalloc 统计内存分配')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    parser.add_argument('--stress', type=int, default=0, metavar='THREADS', help='并发压力测试的线程数')
+    parser.add_argument('--tables', type=int, default=1, help='压力测试的牌桌数')
+    parser.add_argument('--ops', type=int, default=500, help='压力测试中每个线程的操作次数')
+    args = parser.parse_args()
+
+    if args.stress:
+        stats = run_stress(args.stress, args.ops, max(1, args.tables), max(1, min(args.players, 7)), args.seed)
+        if args.json:
+            print(json.dumps(stats, ensure_ascii=False))
+        else:
+            print(f"{stats['threads']} 线程 / {stats['tables']} 桌，操作 {stats['ops']}，完成手数 {stats['hands']}，"
+                  f"耗时 {stats['seconds']}s（{stats['ops_per_sec']} 次/秒）")
+            print(f"异常 {stats['errors']}，筹码守恒违反 {stats['violations']}")
+        if stats['errors'] or stats['violations']:
+            raise SystemExit(1)
+        return
+
+    stats = run_benchmark(args.hands, max(2, min(args.players, 8)), args.difficulty,
+                          seed=args.seed, trace_alloc=args.trace_alloc)
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False))
+        return
+
+    print(f"手数 {stats['hands']}（{stats['games']} 局），动作 {stats['actions']}，耗时 {stats['seconds']}s")
+    print(f"吞吐: {stats['hands_per_sec']} 手/秒, {stats['actions_per_sec']} 动作/秒")
+    print(f"动作延迟: p50 {stats['p50_ms']}ms, p99 {stats['p99_ms']}ms, max {stats['max_ms']}ms")
+    if 'alloc_peak_kb' in stats:
+        print(f"内存: 当前 {stats['alloc_current_kb']} KiB, 峰值 {stats['alloc_peak_kb']} KiB")
+        for line in stats['alloc_top']:
+            print(f'  {line}')
+    print(f"digest: {stats['digest']}")
+
+
+if __name__ == '__main__':
+    main()
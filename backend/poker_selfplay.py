@@ -0,0 +1,168 @@
+"""
+德扑 AI 多进程自对弈 - 按难度两两配对统计筹码期望
+
+每个配对 (A, B) 的牌桌上 A、B 两种难度的 RuleBasedAI 交替入座，每手开始前所有人补满买入，
+按手统计各座位的筹码盈亏。牌桌按 shard 切分到 ProcessPoolExecutor，
+每个 worker 用独立种子驱动自己的 TexasHoldEm 实例，完成一个 shard 就把聚合结果流式返回。
+
+输出 chip-EV 矩阵: EV[A][B] 为与 B 同桌时 A 座位的平均盈亏（bb/100 手）。
+
+用法:
+    python poker_selfplay.py --hands 20000 --workers 8
+    python poker_selfplay.py --hands 100000 --shard-hands 5000 --seed 1 --json
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from texasholdem.game.game import TexasHoldEm
+from texasholdem.game.action_type import ActionType
+
+from app.games import equity
+from app.games.poker_manager import RuleBasedAI
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+def play_shard(seed, difficulty_a, difficulty_b, hands, players=6, buy_in=1000,
+               small_blind=10, big_blind=20, equity_iterations=200):
+    """在一张牌桌上打 hands 手，返回两种难度各自的 (盈亏合计, 平方和, 座位手数)"""
+    random.seed(seed)
+    # 蒙特卡洛胜率只按迭代次数限制，保证同一种子结果一致
+    equity.TIME_BUDGET = 0
+    equity.MAX_ITERATIONS = equity_iterations
+
+    th = TexasHoldEm(buyin=buy_in, big_blind=big_blind, small_blind=small_blind, max_players=players)
+    seats = [difficulty_a if i % 2 == 0 else difficulty_b for i in range(players)]
+    agents = [RuleBasedAI(d) for d in seats]
+    totals = {difficulty_a: [0.0, 0.0, 0], difficulty_b: [0.0, 0.0, 0]}
+
+    for _ in range(hands):
+        # 每手补满筹码，所有座位都参与
+        for player in th.players:
+            player.chips = buy_in
+        th.start_hand()
+
+        while th.is_hand_running():
+            pid = th.current_player
+            action_type, amount = agents[pid].decide_action(th, pid)
+            try:
+                if action_type == ActionType.RAISE and amount:
+                    th.take_action(action_type, total=amount)
+                else:
+                    th.take_action(action_type)
+            except Exception:
+                th.take_action(ActionType.FOLD)
+
+        start_chips = th.hand_history.prehand.player_chips
+        for pid, difficulty in enumerate(seats):
+            payoff = (th.players[pid].chips - start_chips[pid]) / big_blind
+            stats = totals[difficulty]
+            stats[0] += payoff
+            stats[1] += payoff * payoff
+            stats[2] += 1
+
+    return difficulty_a, difficulty_b, totals
+
+
+def build_shards(hands, shard_hands, seed, difficulties=DIFFICULTIES):
+    """每个难度配对（含同难度对照）切分为若干 shard，种子由配对和序号确定"""
+    shards = []
+    for a, b in itertools.combinations_with_replacement(difficulties, 2):
+        for index in range(math.ceil(hands / shard_hands)):
+            count = min(shard_hands, hands - index * shard_hands)
+            shard_seed = zlib.crc32(f'{seed}:{a}:{b}:{index}'.encode())
+            shards.append((shard_seed, a, b, count))
+    return shards
+
+
+def run_selfplay(hands, shard_hands=2000, workers=None, players=6, seed=0,
+                 equity_iterations=200, on_progress=None):
+    """并行自对弈，返回 {(A, B): {A: 统计, B: 统计}}"""
+    results = {}
+    shards = build_shards(hands, shard_hands, seed)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(play_shard, shard_seed, a, b, count, players,
+                        equity_iterations=equity_iterations)
+            for shard_seed, a, b, count in shards
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            a, b, totals = future.result()
+            pairing = results.setdefault((a, b), {})
+            for difficulty, (total, squares, count) in totals.items():
+                merged = pairing.setdefault(difficulty, [0.0, 0.0, 0])
+                merged[0] += total
+                merged[1] += squares
+                merged[2] += count
+            if on_progress:
+                on_progress(done, len(futures))
+
+    return results
+
+
+def ev_matrix(results, difficulties=DIFFICULTIES):
+    """整理为 EV[A][B] = (bb/100, 标准误)"""
+    matrix = {a: {} for a in difficulties}
+    for (a, b), pairing in results.items():
+        for me, other in ((a, b), (b, a)):
+            total, squares, count = pairing[me]
+            mean = total / count
+            variance = max(squares / count - mean * mean, 0.0)
+            matrix[me][other] = (round(mean * 100, 2), round(math.sqrt(variance / count) * 100, 2))
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='德扑 AI 多进程自对弈')
+    parser.add_argument('--hands', type=int, default=20000, help='每个难度配对的手数')
+    parser.add_argument('--shard-hands', type=int, default=2000, help='每个 shard 的手数')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--players', type=int, default=6, help='每桌人数（2-8）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--equity-iterations', type=int, default=200, help='hard 难度蒙特卡洛迭代次数')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count()
+    started = time.perf_counter()
+
+    def progress(done, total):
+        if not args.json:
+            print(f'\r{done}/{total} shards', end='', flush=True)
+
+    results = run_selfplay(args.hands, args.shard_hands, workers, max(2, min(args.players, 8)),
+                           args.seed, args.equity_iterations, on_progress=progress)
+    elapsed = time.perf_counter() - started
+    matrix = ev_matrix(results)
+    total_hands = args.hands * len(results)
+
+    if args.json:
+        print(json.dumps({
+            'hands': total_hands,
+            'workers': workers,
+            'seconds': round(elapsed, 2),
+            'hands_per_sec': round(total_hands / elapsed, 1),
+            'ev_bb_per_100': {a: {b: ev for b, (ev, _) in row.items()} for a, row in matrix.items()},
+            'stderr_bb_per_100': {a: {b: se for b, (_, se) in row.items()} for a, row in matrix.items()},
+        }, ensure_ascii=False))
+        return
+
+    print(f'\n{total_hands} 手，{workers} 进程，耗时 {elapsed:.1f}s（{total_hands / elapsed:.0f} 手/秒）')
+    print('chip EV（bb/100 ± 标准误），行: 本方难度，列: 同桌对手难度')
+    print(' ' * 8 + ''.join(f'{b:>18}' for b in DIFFICULTIES))
+    for a in DIFFICULTIES:
+        cells = ''.join(f'{"%.1f ± %.1f" % matrix[a][b]:>18}' for b in DIFFICULTIES)
+        print(f'{a:<8}{cells}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,21 @@
 import os
 import sys
 
+# Socket.IO runs on eventlet when it is installed (SOCKETIO_ASYNC_MODE unset or
+# "eventlet"). Patch the standard library before anything opens sockets or
+# threads, otherwise blocking DB/HTTP calls stall every connection on the hub.
+if os.environ.get('SOCKETIO_ASYNC_MODE') in (None, '', 'eventlet'):
+    try:
+        import eventlet
+        eventlet.monkey_patch()
+    except ImportError:
+        pass
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app
+from app.extensions import socketio
 
 if __name__ == '__main__':
     # Ensure upload directories exist
@@ -23,4 +34,4 @@ if __name__ == '__main__':
     print("Access URL: http://localhost:5000")
     print("=" * 50)
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
@@ -4,12 +4,23 @@
 import os
 import sys
 
+# Socket.IO runs on eventlet when it is installed (SOCKETIO_ASYNC_MODE unset or
+# "eventlet"). Patch the standard library before anything opens sockets or
+# threads, otherwise blocking DB/HTTP calls stall every connection on the hub.
+if os.environ.get('SOCKETIO_ASYNC_MODE') in (None, '', 'eventlet'):
+    try:
+        import eventlet
+        eventlet.monkey_patch()
+    except ImportError:
+        pass
+
 # Get the directory containing this file
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, PROJECT_ROOT)
 os.chdir(PROJECT_ROOT)
 
 from app import create_app
+from app.extensions import socketio
 
 # Ensure upload directories exist
 upload_dir = os.path.join('static', 'uploads')
@@ -21,4 +32,4 @@ os.makedirs(chat_images_dir, exist_ok=True)
 app = create_app('production')
 
 if __name__ == "__main__":
-    app.run()
+    socketio.run(app)
@@ -4,6 +4,8 @@ import { chatApi, authApi, getImageUrl, validateImageFile } from '../services/ap
 import { useAuthStore } from '../stores/authStore';
 import { useThemeStore } from '../stores/themeStore';
 import { notify, requestNotificationPermission } from '../services/notificationService';
+import { connectChatSocket } from '../services/chatSocket';
+import type { ChatReactionEvent } from '../services/chatSocket';
 import type { ChatMessage, User, ChatReaction } from '../types';
 import { Input, Button, Avatar, Upload, Tooltip, Empty, Spin, message as antMessage, theme } from 'antd';
 import {
@@ -94,10 +96,38 @@ const Chat: React.FC = () => {
 
   useEffect(() => {
     loadMessages();
-    const interval = setInterval(loadMessages, 5000);
-    return () => clearInterval(interval);
   }, []);
 
+  // 新消息和表情反应由服务端推送；断线重连后重新拉取一次，补上断开期间的消息
+  useEffect(() => {
+    const socket = connectChatSocket();
+    let reconnecting = false;
+
+    socket.on('connect', () => {
+      if (reconnecting) loadMessages();
+      reconnecting = true;
+    });
+
+    socket.on('message', (msg: ChatMessage) => {
+      // 只通知对方发的消息，且应用不在前台时
+      if (user && msg.sender_id !== user.id && document.hidden && !notifiedMsgIdsRef.current.has(msg.id)) {
+        notify('Helix 新消息', msg.message_type === 'text' ? msg.content : '[图片]');
+      }
+      notifiedMsgIdsRef.current.add(msg.id);
+      setMessages((prev) => (prev.some((m) => m.id === msg.id) ? prev : [...prev, msg]));
+    });
+
+    socket.on('reaction', (event: ChatReactionEvent) => {
+      setMessages((prev) => prev.map((m) => (
+        m.id === event.message_id ? { ...m, reactions: event.reactions } : m
+      )));
+    });
+
+    return () => {
+      socket.disconnect();
+    };
+  }, [user]);
+
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
@@ -109,7 +139,6 @@ const Chat: React.FC = () => {
     try {
       await chatApi.send(newMessage.trim());
       setNewMessage('');
-      loadMessages();
     } catch (error) {
       console.error('Failed to send message:', error);
       antMessage.error('发送失败');
@@ -127,11 +156,8 @@ const Chat: React.FC = () => {
 
   const handleReaction = useCallback(async (messageId: number, emoji: string) => {
     try {
-      const response = await chatApi.addReaction(messageId, emoji);
-      if (response.data.success) {
-        // 刷新消息列表以获取最新反应状态
-        loadMessages();
-      }
+      // 最新反应状态通过 reaction 事件推送
+      await chatApi.addReaction(messageId, emoji);
     } catch (error) {
       console.error('Failed to add reaction:', error);
       antMessage.error('添加表情失败');
@@ -152,7 +178,6 @@ const Chat: React.FC = () => {
       formData.append('image', file);
       try {
         await chatApi.uploadImage(formData);
-        loadMessages();
         antMessage.success('图片发送成功');
       } catch (error) {
         console.error('Failed to upload image:', error);
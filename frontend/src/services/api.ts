@@ -98,7 +98,7 @@ export const assetApi = {
     api.put(`/api/assets/${id}`, data),
   delete: (id: number): Promise<AxiosResponse<SuccessResponse>> =>
     api.delete(`/api/assets/${id}`),
-  getChartData: (params?: { start_date?: string; end_date?: string; type?: string; pie_type?: string }): Promise<AxiosResponse<ChartDataResponse>> =>
+  getChartData: (params?: { start_date?: string; end_date?: string; type?: string; pie_type?: string; max_points?: number }): Promise<AxiosResponse<ChartDataResponse>> =>
     api.get('/api/assets/chart-data', { params }),
 };
 
@@ -225,6 +225,12 @@ export const travelApi = {
   deleteItinerary: (itemId: number): Promise<AxiosResponse<SuccessResponse>> =>
     api.delete(`/api/travel/itineraries/${itemId}`),
 
+  getItineraryRoute: (itemId: number): Promise<AxiosResponse<{ success: boolean; route_status?: TravelItinerary['route_status']; error?: string }>> =>
+    api.get(`/api/travel/itineraries/${itemId}/route`),
+
+  refreshPlanRoutes: (planId: number, data?: { day_number?: number; force?: boolean }): Promise<AxiosResponse<{ success: boolean; unchanged?: number; cleared?: number; reused?: number; queued?: number; error?: string }>> =>
+    api.post(`/api/travel/plans/${planId}/routes`, data ?? {}),
+
   // 高德地图API
   amapSearch: (params: { keywords: string; city?: string; types?: string }): Promise<AxiosResponse<AmapSearchResponse>> =>
     api.get('/api/travel/amap/search', { params }),
@@ -0,0 +1,21 @@
+import { io } from 'socket.io-client';
+import type { Socket } from 'socket.io-client';
+import { API_BASE_URL } from './api';
+import type { ChatReaction } from '../types';
+
+const TOKEN_KEY = 'helix_auth_token';
+
+// 服务端推送的表情反应变化（message 事件直接推送 ChatMessage）
+export interface ChatReactionEvent {
+  message_id: number;
+  reactions: ChatReaction[];
+  version: number;
+}
+
+// 连接 /chat 推送通道：浏览器握手时带 session cookie，Tauri 客户端没有 cookie，传 JWT
+export const connectChatSocket = (): Socket =>
+  io(`${API_BASE_URL}/chat`, {
+    withCredentials: true,
+    transports: ['websocket'],  // 多个 gunicorn worker 之间没有粘性会话，不能使用长轮询
+    auth: (cb) => cb({ token: localStorage.getItem(TOKEN_KEY) }),
+  });
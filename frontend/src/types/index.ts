@@ -301,6 +301,7 @@ export interface TravelItinerary {
       }>;
     }>;
   };
+  route_status?: 'pending' | 'ready' | 'failed' | null;
   // 交通类型专用字段（起终点）
   from_location_name?: string;
   from_location_address?: string;